@@ -0,0 +1,144 @@
+"""
+    Title       : Tetris Game - Autoplayer
+
+    Enumerates every reachable placement (rotation x column) of the current
+    and next pieces on the bitboard and plays the best one according to a
+    weighted heuristic.
+"""
+from collections import namedtuple
+
+from board import COLS, FULL_MASK, POPCOUNT, ROWS, Board
+from engine import ACTION_HARD_DROP, ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE
+from pieces import SHAPES, SPAWN_ROWS
+
+Weights = namedtuple('Weights', ['height', 'lines', 'holes', 'bumpiness'])
+DEFAULT_WEIGHTS = Weights(-0.510066, 0.760666, -0.35663, -0.184483)
+
+Placement = namedtuple('Placement', ['rotation', 'pos_x', 'pos_y', 'score'])
+
+def shifted(mask, pos_x):
+    """Moves a shape row mask to its platform column"""
+    return mask << pos_x if pos_x >= 0 else mask >> -pos_x
+
+def drop(board, shape, pos_x, pos_y):
+    """Returns the row where a shape lands when dropped from (pos_x, pos_y)"""
+    return board.landing_row(shape, pos_x, pos_y)
+
+def place(rows, shape, pos_x, pos_y):
+    """Returns the rows after merging a shape and breaking the lines, and the lines count"""
+    rows = list(rows)
+    for d_y, mask in shape.rows:
+        if pos_y + d_y >= 0:
+            rows[pos_y + d_y] |= shifted(mask, pos_x)
+    kept = [row for row in rows if row != FULL_MASK]
+    lines = ROWS - len(kept)
+    if lines:
+        rows = [0] * lines + kept
+    return rows, lines
+
+def evaluate(rows, lines, weights):
+    """Scores the platform rows: aggregate height, holes, bumpiness and lines broken
+
+    One pass over the rows of a placement, which is cheaper than copying a
+    Board and refreshing its cached features: the heuristic needs neither the
+    transitions nor the wells, and every placement is only scored once."""
+    heights = [0] * COLS
+    seen = 0
+    holes = 0
+    for y_index, row in enumerate(rows):
+        holes += POPCOUNT[seen & ~row & FULL_MASK]
+        new = row & ~seen
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = ROWS - y_index
+            new ^= low
+        seen |= row
+    bumpiness = 0
+    for x_index in range(COLS - 1):
+        bumpiness += abs(heights[x_index] - heights[x_index + 1])
+    return weights.height * sum(heights) + weights.lines * lines +\
+        weights.holes * holes + weights.bumpiness * bumpiness
+
+def placements(board, piece_type, rotation=0, pos_x=0, pos_y=None):
+    """Yields every reachable final (rotation, pos_x, pos_y) of a piece
+
+    The piece is rotated in place, then moved sideways, then dropped; every
+    intermediate position has to fit the platform."""
+    shapes = SHAPES[piece_type]
+    if pos_y is None:
+        pos_y = SPAWN_ROWS[piece_type]
+    for turns in range(len(shapes)):
+        target = (rotation + turns) % len(shapes)
+        if not board.fits(shapes[target], pos_x, pos_y):
+            break
+        shape = shapes[target]
+        yield target, pos_x, drop(board, shape, pos_x, pos_y)
+        for direction in (-1, 1):
+            column = pos_x + direction
+            while board.fits(shape, column, pos_y):
+                yield target, column, drop(board, shape, column, pos_y)
+                column += direction
+
+class AutoPlayer:
+    """Plays the best placement of the current piece, looking at the next one"""
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, lookahead=True, beam=6):
+        self.weights = weights
+        self.lookahead = lookahead
+        self.beam = beam
+        self.__planned = None
+
+    def __best_score(self, rows, piece_type):
+        """Returns the best heuristic score reachable by a piece on the given rows"""
+        board = Board()
+        board.rows = rows
+        board.update_features()
+        shapes = SHAPES[piece_type]
+        best = None
+        for rotation, pos_x, pos_y in placements(board, piece_type):
+            score = evaluate(*place(rows, shapes[rotation], pos_x, pos_y), self.weights)
+            if best is None or score > best:
+                best = score
+        return best
+
+    def choose(self, board, piece, next_type=None):
+        """Returns the best Placement of the piece, None if it cannot move"""
+        shapes = SHAPES[piece.piece_type]
+        candidates = []
+        for rotation, pos_x, pos_y in placements(board, piece.piece_type, piece.rotation,\
+            piece.pos_x, piece.pos_y):
+            rows, lines = place(board.rows, shapes[rotation], pos_x, pos_y)
+            candidates.append((evaluate(rows, lines, self.weights), rotation, pos_x, pos_y, rows, lines))
+        if not candidates:
+            return None
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        if self.lookahead and next_type is not None:
+            rescored = []
+            for _, rotation, pos_x, pos_y, rows, lines in candidates[:self.beam]:
+                score = self.__best_score(rows, next_type)
+                if score is None:
+                    score = float('-inf')
+                rescored.append((score + self.weights.lines * lines, rotation, pos_x, pos_y))
+            rescored.sort(key=lambda candidate: candidate[0], reverse=True)
+            score, rotation, pos_x, pos_y = rescored[0]
+        else:
+            score, rotation, pos_x, pos_y = candidates[0][:4]
+        return Placement(rotation, pos_x, pos_y, score)
+
+    def plan(self, state):
+        """Returns the actions moving the current piece to its best placement and dropping it"""
+        piece = state.current_piece
+        placement = self.choose(state.board, piece, state.next_piece.piece_type)
+        if placement is None:
+            return []
+        turns = (placement.rotation - piece.rotation) % len(SHAPES[piece.piece_type])
+        shift = placement.pos_x - piece.pos_x
+        return [ACTION_ROTATE] * turns +\
+            [ACTION_RIGHT if shift > 0 else ACTION_LEFT] * abs(shift) + [ACTION_HARD_DROP]
+
+    def __call__(self, state):
+        """Policy interface: returns the actions to apply before the next tick"""
+        if self.__planned == state.pieces:
+            return []
+        self.__planned = state.pieces
+        return self.plan(state)
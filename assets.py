@@ -0,0 +1,30 @@
+"""
+    Title       : Tetris Game - Assets
+
+    Process-wide image cache: every GIF is decoded once, on first use, and
+    shared by all the screens.
+"""
+from os.path import abspath, dirname, join
+from time import perf_counter
+from tkinter import PhotoImage
+
+ASSETS_DIR = dirname(abspath(__file__))
+IMAGES = ('bg.gif', 'tutorial.gif', 'game_over.gif', 'home.gif', 'play_btn.gif', 'exit_btn.gif')
+
+CACHE = {}
+LOAD_TIMES = {}
+
+def get_image(name):
+    """Returns the PhotoImage of an asset file, decoding it the first time only"""
+    image = CACHE.get(name)
+    if image is None:
+        start = perf_counter()
+        image = CACHE[name] = PhotoImage(file=join(ASSETS_DIR, name))
+        LOAD_TIMES[name] = perf_counter() - start
+    return image
+
+def preload(names=IMAGES):
+    """Decodes the given assets, returns the seconds spent loading them"""
+    for name in names:
+        get_image(name)
+    return sum(LOAD_TIMES[name] for name in names)
@@ -0,0 +1,176 @@
+"""
+    Title       : Tetris Game - Batch Engine
+
+    Steps N games at once with NumPy (optional dependency, only needed
+    by this module). The rules are the ones of engine.GameState.
+"""
+import numpy as np
+
+from board import COLS, FULL_MASK, ROWS
+from engine import DELAY, LEVEL_DELAY_STEP, LINE_SCORES, LINES_LEVEL_UP, MIN_DELAY
+from pieces import PIECE_TYPES, SHAPES, SPAWN_ROWS
+
+NOOP, LEFT, RIGHT, ROTATE = 0, 1, 2, 3
+
+def build_tables():
+    """Builds the (piece type, rotation) lookup arrays from the shapes table"""
+    types = len(PIECE_TYPES)
+    masks = np.zeros((types, 4, 4), dtype=np.int32)
+    min_dx = np.zeros((types, 4), dtype=np.int32)
+    max_dx = np.zeros((types, 4), dtype=np.int32)
+    for type_index, piece_type in enumerate(PIECE_TYPES):
+        shapes = SHAPES[piece_type]
+        for rotation in range(4):
+            shape = shapes[rotation % len(shapes)]
+            for d_y, mask in shape.rows:
+                masks[type_index, rotation, d_y] = mask
+            min_dx[type_index, rotation] = shape.min_dx
+            max_dx[type_index, rotation] = shape.max_dx
+    rotations = np.array([len(SHAPES[piece_type]) for piece_type in PIECE_TYPES], dtype=np.int32)
+    spawn_rows = np.array([SPAWN_ROWS[piece_type] for piece_type in PIECE_TYPES], dtype=np.int32)
+    return masks, min_dx, max_dx, rotations, spawn_rows
+
+SHAPE_MASKS, SHAPE_MIN_DX, SHAPE_MAX_DX, ROTATION_COUNTS, SPAWN_Y = build_tables()
+SCORES = np.array(LINE_SCORES, dtype=np.int64)
+DY = np.arange(4, dtype=np.int32)
+BUFFER_BAGS = 64
+
+def bag_sequences(rng, count, bags=BUFFER_BAGS):
+    """Returns count sequences of 7-bags as piece type indexes"""
+    return rng.random((count, bags, len(PIECE_TYPES))).argsort(axis=2).reshape(count, -1).astype(np.int32)
+
+def uniform_sequences(rng, count, bags=BUFFER_BAGS):
+    """Returns count sequences of independently drawn piece type indexes"""
+    return rng.integers(0, len(PIECE_TYPES), (count, bags * len(PIECE_TYPES))).astype(np.int32)
+
+SEQUENCES = {'bag': bag_sequences, 'uniform': uniform_sequences}
+
+class BatchGame:
+    """N independent games stored as an (N, ROWS) array of row bitmasks"""
+
+    def __init__(self, count, seed=None, randomizer='bag'):
+        self.count = count
+        self.rng = np.random.default_rng(seed)
+        self.__generate = SEQUENCES[randomizer]
+        self.__sequences = self.__generate(self.rng, count)
+        self.__cursors = np.zeros(count, dtype=np.int64)
+        self.boards = np.zeros((count, ROWS), dtype=np.uint16)
+        everyone = np.arange(count)
+        self.types = self.__pull(everyone)
+        self.next_types = self.__pull(everyone)
+        self.rotations = np.zeros(count, dtype=np.int32)
+        self.pos_x = np.zeros(count, dtype=np.int32)
+        self.pos_y = SPAWN_Y[self.types]
+        self.scores = np.zeros(count, dtype=np.int64)
+        self.lines = np.zeros(count, dtype=np.int64)
+        self.levels = np.ones(count, dtype=np.int64)
+        self.delays = np.full(count, DELAY, dtype=np.int64)
+        self.pieces = np.zeros(count, dtype=np.int64)
+        self.ticks = np.zeros(count, dtype=np.int64)
+        self.is_over = np.zeros(count, dtype=bool)
+
+    def __pull(self, index):
+        """Returns the next piece type of the given games from the pregenerated sequences"""
+        cursors = self.__cursors[index]
+        types = self.__sequences[index, cursors]
+        cursors += 1
+        exhausted = cursors == self.__sequences.shape[1]
+        if exhausted.any():
+            refill = index[exhausted]
+            self.__sequences[refill] = self.__generate(self.rng, len(refill))
+            cursors[exhausted] = 0
+        self.__cursors[index] = cursors
+        return types
+
+    def __shifted_masks(self, types, rotations, pos_x):
+        """Returns the (n, 4) row masks of the pieces moved to their columns"""
+        masks = SHAPE_MASKS[types, rotations]
+        left = np.maximum(pos_x, 0)[:, None]
+        right = np.maximum(-pos_x, 0)[:, None]
+        return (masks << left) >> right
+
+    def fits(self, types, rotations, pos_x, pos_y):
+        """Checks for every game if a piece placement stays inside the empty cells"""
+        inside = (pos_x + SHAPE_MIN_DX[types, rotations] >= 0) &\
+            (pos_x + SHAPE_MAX_DX[types, rotations] < COLS)
+        masks = self.__shifted_masks(types, rotations, pos_x)
+        rows = pos_y[:, None] + DY
+        below = (rows >= ROWS) & (masks != 0)
+        on_board = (rows >= 0) & (rows < ROWS)
+        platform = self.boards[np.arange(self.count)[:, None], np.clip(rows, 0, ROWS - 1)]
+        overlap = on_board & ((platform.astype(np.int32) & masks) != 0)
+        return inside & ~below.any(axis=1) & ~overlap.any(axis=1)
+
+    def step(self, actions):
+        """Applies one action code (NOOP, LEFT, RIGHT, ROTATE) per game"""
+        actions = np.asarray(actions)
+        pos_x = self.pos_x + (actions == RIGHT) - (actions == LEFT)
+        rotations = np.where(actions == ROTATE,\
+            (self.rotations + 1) % ROTATION_COUNTS[self.types], self.rotations)
+        moved = (actions != NOOP) & ~self.is_over &\
+            self.fits(self.types, rotations, pos_x, self.pos_y)
+        self.pos_x = np.where(moved, pos_x, self.pos_x)
+        self.rotations = np.where(moved, rotations, self.rotations)
+        return moved
+
+    def tick(self):
+        """Creates a game cycle for every running game, returns the lines broken per game"""
+        active = ~self.is_over
+        self.ticks += active
+        falling = active & self.fits(self.types, self.rotations, self.pos_x, self.pos_y + 1)
+        self.pos_y = self.pos_y + falling
+        locking = active & ~falling
+        cleared = np.zeros(self.count, dtype=np.int64)
+        if locking.any():
+            cleared[locking] = self.__lock(np.flatnonzero(locking))
+        return cleared
+
+    def __lock(self, index):
+        """Merges, clears lines, scores and spawns the next piece for the given games"""
+        types = self.types[index]
+        rotations = self.rotations[index]
+        masks = self.__shifted_masks(types, rotations, self.pos_x[index])
+        rows = self.pos_y[index][:, None] + DY
+        valid = (masks != 0) & (rows >= 0)
+        games = np.broadcast_to(index[:, None], rows.shape)
+        np.bitwise_or.at(self.boards, (games[valid], rows[valid]), masks[valid].astype(np.uint16))
+        self.pieces[index] += 1
+        # A piece locked above the top limit ends the game
+        topped_out = ((masks != 0) & (rows < 0)).any(axis=1)
+
+        # Breaking the completed lines: cleared rows are moved to the top and emptied
+        boards = self.boards[index]
+        full = boards == FULL_MASK
+        counts = full.sum(axis=1)
+        if counts.any():
+            order = np.argsort(~full, axis=1, kind='stable')
+            boards = np.take_along_axis(boards, order, axis=1)
+            boards[np.arange(ROWS) < counts[:, None]] = 0
+            self.boards[index] = boards
+        levels = self.levels[index]
+        self.scores[index] += SCORES[counts] * levels
+        lines = self.lines[index] + counts
+        self.lines[index] = lines
+
+        # Leveling UP
+        new_levels = lines // LINES_LEVEL_UP + 1
+        level_up = (new_levels > 1) & (new_levels != levels)
+        self.levels[index] = np.where(level_up, new_levels, levels)
+        delays = self.delays[index]
+        self.delays[index] = np.where(level_up, np.maximum(delays - LEVEL_DELAY_STEP, MIN_DELAY), delays)
+
+        # Setting the current piece and generating a new next piece
+        types = self.next_types[index]
+        self.types[index] = types
+        self.next_types[index] = self.__pull(index)
+        self.rotations[index] = 0
+        self.pos_x[index] = 0
+        self.pos_y[index] = SPAWN_Y[types]
+        spawned = self.fits(self.types, self.rotations, self.pos_x, self.pos_y)[index]
+        self.is_over[index] |= topped_out | ~spawned
+        return counts
+
+    def get_cells(self):
+        """Returns the platforms as an (N, ROWS, COLS) uint8 array of occupied cells"""
+        bits = np.arange(COLS, dtype=np.uint16)
+        return ((self.boards[:, :, None] >> bits) & 1).astype(np.uint8)
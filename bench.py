@@ -0,0 +1,338 @@
+"""
+    Title       : Tetris Game - Benchmarks
+
+    Seeded, headless benchmarks of the core game operations:
+        python bench.py --output bench.json
+        python bench.py --compare bench.json
+"""
+import gc
+import json
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from functools import partial
+from random import Random
+from time import perf_counter
+
+from board import COLS, FULL_MASK, ROWS, Board
+from engine import ACTION_LEFT, ACTION_RIGHT, Controller, GameState, Player
+from pieces import PIECE_TYPES, BagRandomizer, Piece, PiecePool
+from render import Renderer
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """Registers a benchmark: a function taking a seeded Random and returning the operation to time"""
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+class StubCanvas:
+    """Canvas replacement counting the item calls, used to render without a display"""
+
+    def __init__(self):
+        self.items = 0
+        self.calls = 0
+
+    def __create(self, *args, **kwargs):
+        self.items += 1
+        self.calls += 1
+        return self.items
+
+    create_image = create_rectangle = create_text = __create
+
+    def itemconfig(self, *args, **kwargs):
+        """Counts an item update"""
+        self.calls += 1
+
+    coords = itemconfig
+
+def random_board(rng, height=8):
+    """Returns a board with its bottom rows randomly filled, none of them full"""
+    board = Board()
+    for y_index in range(ROWS - height, ROWS):
+        row = rng.getrandbits(COLS) & ~(1 << rng.randrange(COLS))
+        board.rows[y_index] = row
+        for x_index in range(COLS):
+            if row >> x_index & 1:
+                board.colors[y_index * COLS + x_index] = rng.randrange(1, len(PIECE_TYPES) + 1)
+    board.update_features()
+    return board
+
+@benchmark('spawn')
+def bench_spawn(rng):
+    """Creating a new piece"""
+    types = [rng.choice(PIECE_TYPES) for _ in range(1024)]
+    index = [0]
+    def operation():
+        index[0] = (index[0] + 1) & 1023
+        return Piece(types[index[0]])
+    return operation
+
+@benchmark('spawn_pooled')
+def bench_spawn_pooled(rng):
+    """Spawning a piece the way a game state does, from its pool and randomizer"""
+    pool = PiecePool()
+    randomizer = BagRandomizer(rng.random())
+    current = [pool.acquire(randomizer.next())]
+    def operation():
+        # The merged piece goes back to the pool before the next one spawns
+        pool.release(current[0])
+        current[0] = pool.acquire(randomizer.next())
+        return current[0]
+    return operation
+
+@benchmark('move')
+def bench_move(rng):
+    """Moving a piece right then left"""
+    board = Board()
+    piece = Piece('T')
+    piece.pos_y = 8
+    def operation():
+        piece.move_right(board)
+        piece.move_left(board)
+        piece.check_movement(1, board)
+    return operation
+
+@benchmark('rotate')
+def bench_rotate(rng):
+    """Rotating one piece of every type"""
+    board = Board()
+    pieces = [Piece(piece_type) for piece_type in PIECE_TYPES]
+    for piece in pieces:
+        piece.pos_x, piece.pos_y = 3, 8
+    def operation():
+        for piece in pieces:
+            piece.rotate(board)
+    return operation
+
+@benchmark('gravity')
+def bench_gravity(rng):
+    """Moving a piece down until it lands"""
+    board = random_board(rng)
+    piece = Piece('L')
+    shape = piece.get_shape()
+    def operation():
+        if board.fits(shape, piece.pos_x, piece.pos_y + 1):
+            piece.gravity()
+        else:
+            piece.pos_y = -1
+    return operation
+
+@benchmark('hard_drop')
+def bench_hard_drop(rng):
+    """Finding the landing row of a piece from the spawn row"""
+    board = random_board(rng)
+    piece = Piece('L')
+    shape = piece.get_shape()
+    def operation():
+        return board.landing_row(shape, piece.pos_x, piece.pos_y)
+    return operation
+
+@benchmark('merge')
+def bench_merge(rng):
+    """Merging a piece into the platform"""
+    board = Board()
+    piece = Piece('J')
+    piece.pos_y = ROWS - 3
+    shape = piece.get_shape()
+    def operation():
+        board.merge(shape, piece.pos_x, piece.pos_y, piece.get_color_code())
+    return operation
+
+def bench_break_lines(rng, lines_sum):
+    """Searching and breaking 1 to 4 completed lines, then reading the features"""
+    template = random_board(rng, 12)
+    for y_index in rng.sample(range(ROWS - 12, ROWS), lines_sum):
+        template.rows[y_index] = FULL_MASK
+    template.update_features()
+    template.get_features()
+    board = Board()
+    def operation():
+        board.copy_from(template)
+        board.break_lines(board.get_lines())
+        return board.get_features()
+    return operation
+
+for lines_count in range(1, 5):
+    BENCHMARKS['break_lines_{}'.format(lines_count)] = partial(bench_break_lines, lines_sum=lines_count)
+
+def rebuild_break_lines(board, lines):
+    """Previous line clear rebuilding the rows and colors then the features,
+    kept as the reference of break_lines"""
+    cleared = set(lines)
+    kept = [y_index for y_index in range(ROWS) if y_index not in cleared]
+    colors = bytearray(len(lines) * COLS)
+    for y_index in kept:
+        colors += board.colors[y_index * COLS:(y_index + 1) * COLS]
+    board.rows = [0] * len(lines) + [board.rows[y_index] for y_index in kept]
+    board.colors = colors
+    board.update_features()
+
+@benchmark('break_lines_4_rebuild')
+def bench_break_lines_rebuild(rng):
+    """Breaking 4 completed lines with the previous rebuilding line clear, then reading the features"""
+    template = random_board(rng, 12)
+    for y_index in rng.sample(range(ROWS - 12, ROWS), 4):
+        template.rows[y_index] = FULL_MASK
+    template.update_features()
+    template.get_features()
+    board = Board()
+    def operation():
+        board.copy_from(template)
+        rebuild_break_lines(board, board.get_lines())
+        return board.get_features()
+    return operation
+
+@benchmark('render_full')
+def bench_render_full(rng):
+    """Drawing a whole game on a new canvas"""
+    state = GameState(Player('BENCH'), rng.getrandbits(32))
+    state.board = random_board(rng, 12)
+    def operation():
+        renderer = Renderer(StubCanvas())
+        renderer.draw(state)
+        return renderer
+    return operation
+
+@benchmark('render_frame')
+def bench_render_frame(rng):
+    """Drawing a frame after the piece moved"""
+    state = GameState(Player('BENCH'), rng.getrandbits(32))
+    state.board = random_board(rng, 12)
+    renderer = Renderer(StubCanvas())
+    renderer.draw(state)
+    def operation():
+        state.step(ACTION_RIGHT if state.current_piece.pos_x < 3 else ACTION_LEFT)
+        renderer.draw(state)
+    return operation
+
+@benchmark('render_idle')
+def bench_render_idle(rng):
+    """Drawing a frame where nothing moved"""
+    state = GameState(Player('BENCH'), rng.getrandbits(32))
+    state.board = random_board(rng, 12)
+    renderer = Renderer(StubCanvas())
+    renderer.draw(state)
+    def operation():
+        renderer.draw(state)
+    return operation
+
+@benchmark('game_tick')
+def bench_game_tick(rng):
+    """Running a game cycle"""
+    seed = rng.getrandbits(32)
+    state = [GameState(Player('BENCH'), seed)]
+    def operation():
+        if state[0].is_over:
+            state[0] = GameState(Player('BENCH'), seed)
+        state[0].tick()
+    return operation
+
+@benchmark('input_frame')
+def bench_input_frame(rng):
+    """Running a logic frame with a shift key held"""
+    seed = rng.getrandbits(32)
+    controller = [Controller(GameState(Player('BENCH'), seed))]
+    def operation():
+        if controller[0].state.is_over:
+            controller[0] = Controller(GameState(Player('BENCH'), seed))
+        if controller[0].frames % 64 == 0:
+            controller[0].release(ACTION_LEFT if controller[0].frames % 128 else ACTION_RIGHT)
+            controller[0].press(ACTION_RIGHT if controller[0].frames % 128 else ACTION_LEFT)
+        controller[0].frame()
+    return operation
+
+def measure(operation, min_time=0.2, repeat=5):
+    """Returns the best operations/second over several timed runs"""
+    iterations = 1
+    while True:
+        start = perf_counter()
+        for _ in range(iterations):
+            operation()
+        elapsed = perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        iterations *= 4
+    iterations = max(1, int(iterations * min_time / elapsed))
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(iterations):
+            operation()
+        best = min(best, perf_counter() - start)
+    return iterations / best
+
+def measure_allocations(operation, iterations=1000):
+    """Returns the peak traced bytes and the memory blocks allocated per operation
+
+    The results of the operations are kept alive while the blocks are counted,
+    so every object an operation builds and returns is counted; the
+    temporaries freed before the operation returns are not."""
+    results = [None] * iterations
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    for index in range(iterations):
+        results[index] = operation()
+    allocated = (sys.getallocatedblocks() - blocks) / iterations
+    del results
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    for _ in range(iterations):
+        operation()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak, allocated
+
+def measure_footprint(count=1000):
+    """Returns the traced bytes kept alive by one game state"""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    states = [GameState(Player('BENCH'), seed) for seed in range(count)]
+    footprint = (tracemalloc.get_traced_memory()[0] - base) / count
+    tracemalloc.stop()
+    del states
+    return footprint
+
+def run(names=None, seed=0, min_time=0.2):
+    """Runs the benchmarks, returns their results by name"""
+    results = {}
+    for name in names or BENCHMARKS:
+        operation = BENCHMARKS[name](Random(seed))
+        ops = measure(operation, min_time)
+        peak, blocks = measure_allocations(BENCHMARKS[name](Random(seed)))
+        results[name] = {'ops_per_second': ops, 'peak_bytes': peak, 'allocated_blocks_per_op': blocks}
+    return results
+
+def main():
+    """Benchmark entry point"""
+    parser = ArgumentParser(description='Benchmarks the core Tetris operations')
+    parser.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timed run')
+    parser.add_argument('--output', help='JSON file receiving the results')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args()
+
+    results = run(args.names, args.seed, args.min_time)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as previous:
+            baseline = json.load(previous)
+    for name, result in results.items():
+        line = '{:<22} {:>14,.0f} ops/s {:>10,} B peak {:>8.2f} blocks/op'.format(\
+            name, result['ops_per_second'], result['peak_bytes'], result['allocated_blocks_per_op'])
+        if name in baseline and 'ops_per_second' in baseline[name]:
+            line += '  x{:.2f}'.format(result['ops_per_second'] / baseline[name]['ops_per_second'])
+        print(line)
+    footprint = measure_footprint()
+    print('{:<22} {:>14,.0f} B per game state'.format('footprint', footprint))
+    if args.output:
+        results['footprint'] = {'bytes_per_game_state': footprint}
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+if __name__ == '__main__':
+    main()
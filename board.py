@@ -0,0 +1,322 @@
+"""
+    Title       : Tetris Game - Bitboard
+"""
+from collections import namedtuple
+
+ROWS = 18
+COLS = 10
+FULL_MASK = (1 << COLS) - 1
+EMPTY = 0
+EMPTY_COLORS = memoryview(bytes(ROWS * COLS))
+ALL_ROWS = (1 << ROWS) - 1
+# Color code of the garbage rows, after the codes of the piece types
+GARBAGE_COLOR = 8
+# Set bits of every mask up to the row width plus one wall bit
+POPCOUNT = tuple(bin(mask).count('1') for mask in range(1 << (COLS + 1)))
+
+# Board metrics, heights being counted from the floor
+#   aggregate_height   : sum of the column heights
+#   max_height         : height of the highest column
+#   holes              : empty cells below the top of their column
+#   row_transitions    : occupied/empty changes along the rows, walls being occupied
+#   column_transitions : occupied/empty changes down the columns, from the empty
+#                        sky to the occupied floor
+#   bumpiness          : sum of the height differences of adjacent columns
+#   wells              : sum of the depths of the columns lower than both neighbours,
+#                        walls being as high as the platform
+Features = namedtuple('Features', ['aggregate_height', 'max_height', 'holes', 'row_transitions',\
+    'column_transitions', 'bumpiness', 'wells'])
+
+def row_transitions(row):
+    """Counts the occupied/empty changes along a row, the walls being occupied"""
+    return POPCOUNT[((row << 1) | 1) ^ (row | (1 << COLS))]
+
+EMPTY_TRANSITIONS = row_transitions(EMPTY)
+
+class Board:
+    """Platform structure: one integer bitmask per row
+
+    Bit x of rows[y] is set when the cell (x, y) is occupied, row 0 being
+    the top of the platform. The colors are kept in a parallel bytearray
+    (one color code per cell) which is only read for rendering, and tops[x]
+    is the highest occupied row of column x (ROWS when empty).
+
+    The Features are cached per row and per column. merge() and
+    break_lines() keep the tops, the cell count and the aggregate height
+    up to date and only mark the rows and columns they changed, the row
+    features of the surviving rows moving with them on a line clear; the
+    marked entries are recomputed when the features are read. Code writing
+    the rows directly has to call update_features()."""
+
+    __slots__ = ('rows', 'colors', 'tops', 'cells', '__row_transitions', '__boundaries',\
+        '__bumps', '__wells', '__height', '__row_total', '__column_total', '__bumpiness',\
+        '__well_total', '__dirty_rows', '__dirty_columns')
+
+    def __init__(self):
+        self.rows = [EMPTY] * ROWS
+        self.colors = bytearray(ROWS * COLS)
+        self.tops = [ROWS] * COLS
+        self.__row_transitions = [0] * ROWS
+        # Column transitions between the rows y - 1 and y, the last one with the floor
+        self.__boundaries = [0] * (ROWS + 1)
+        self.__bumps = [0] * (COLS - 1)
+        self.__wells = [0] * COLS
+        self.__row_total = 0
+        self.__column_total = 0
+        self.__bumpiness = 0
+        self.__well_total = 0
+        self.update_features()
+
+    def update_features(self):
+        """Recomputes the column tops from the rows and marks every cached feature"""
+        self.cells = sum(POPCOUNT[row] for row in self.rows)
+        self.__update_tops(0)
+        # Bit y: the transitions of row y and the boundaries around it are stale
+        self.__dirty_rows = ALL_ROWS
+        # Bit x: the top of column x changed
+        self.__dirty_columns = FULL_MASK
+
+    def copy_from(self, board):
+        """Makes this board a copy of another one, cached features included"""
+        self.rows[:] = board.rows
+        self.colors[:] = board.colors
+        self.tops[:] = board.tops
+        self.cells = board.cells
+        self.__row_transitions[:] = board.__row_transitions
+        self.__boundaries[:] = board.__boundaries
+        self.__bumps[:] = board.__bumps
+        self.__wells[:] = board.__wells
+        self.__height = board.__height
+        self.__row_total = board.__row_total
+        self.__column_total = board.__column_total
+        self.__bumpiness = board.__bumpiness
+        self.__well_total = board.__well_total
+        self.__dirty_rows = board.__dirty_rows
+        self.__dirty_columns = board.__dirty_columns
+
+    def __update_tops(self, first, columns=FULL_MASK):
+        """Recomputes the tops of the given columns and the aggregate height,
+        the rows above first being empty"""
+        tops = self.tops
+        missing = columns
+        if columns == FULL_MASK:
+            tops[:] = [ROWS] * COLS
+        else:
+            while columns:
+                low = columns & -columns
+                tops[low.bit_length() - 1] = ROWS
+                columns ^= low
+        rows = self.rows
+        for y_index in range(first, ROWS):
+            found = rows[y_index] & missing
+            while found:
+                low = found & -found
+                tops[low.bit_length() - 1] = y_index
+                found ^= low
+            missing &= ~rows[y_index]
+            if not missing:
+                break
+        self.__height = ROWS * COLS - sum(tops)
+
+    def __update_rows(self):
+        """Recomputes the transitions of the marked rows and the boundaries around them"""
+        rows = self.rows
+        transitions = self.__row_transitions
+        boundaries = self.__boundaries
+        dirty = self.__dirty_rows
+        while dirty:
+            low = dirty & -dirty
+            dirty ^= low
+            y_index = low.bit_length() - 1
+            row = rows[y_index]
+            transitions[y_index] = row_transitions(row)
+            boundaries[y_index] = POPCOUNT[(rows[y_index - 1] if y_index else EMPTY) ^ row]
+            boundaries[y_index + 1] =\
+                POPCOUNT[row ^ (rows[y_index + 1] if y_index + 1 < ROWS else FULL_MASK)]
+        self.__dirty_rows = 0
+        self.__row_total = sum(transitions)
+        self.__column_total = sum(boundaries)
+
+    def __update_columns(self, first, last):
+        """Updates the bumpiness and the wells around the columns first to last"""
+        tops = self.tops
+        bumps = self.__bumps
+        bumpiness = self.__bumpiness
+        for x_index in range(max(first - 1, 0), min(last + 1, COLS - 1)):
+            bump = tops[x_index] - tops[x_index + 1]
+            if bump < 0:
+                bump = -bump
+            bumpiness += bump - bumps[x_index]
+            bumps[x_index] = bump
+        self.__bumpiness = bumpiness
+        wells = self.__wells
+        well_total = self.__well_total
+        for x_index in range(max(first - 1, 0), min(last + 2, COLS)):
+            # The walls are as high as the platform
+            left = tops[x_index - 1] if x_index > 0 else 0
+            right = tops[x_index + 1] if x_index < COLS - 1 else 0
+            depth = tops[x_index] - (left if left > right else right)
+            if depth < 0:
+                depth = 0
+            well_total += depth - wells[x_index]
+            wells[x_index] = depth
+        self.__well_total = well_total
+
+    def get_features(self):
+        """Returns the Features of the platform, refreshing the marked rows and columns"""
+        if self.__dirty_rows:
+            self.__update_rows()
+        columns = self.__dirty_columns
+        if columns:
+            self.__update_columns((columns & -columns).bit_length() - 1, columns.bit_length() - 1)
+            self.__dirty_columns = 0
+        return Features(self.__height, ROWS - min(self.tops), self.__height - self.cells,\
+            self.__row_total, self.__column_total, self.__bumpiness, self.__well_total)
+
+    def is_occupied(self, x_index, y_index):
+        """Returns True if the cell is occupied"""
+        return (self.rows[y_index] >> x_index) & 1 == 1
+
+    def get_color(self, x_index, y_index):
+        """Returns the color code of a cell (0 when empty)"""
+        return self.colors[y_index * COLS + x_index]
+
+    def fits(self, shape, pos_x, pos_y):
+        """Checks if a piece shape placed at (pos_x, pos_y) stays inside the empty cells"""
+        if pos_x + shape.min_dx < 0 or pos_x + shape.max_dx >= COLS:
+            return False
+        rows = self.rows
+        for d_y, mask in shape.rows:
+            y_index = pos_y + d_y
+            if y_index >= ROWS:
+                return False
+            if y_index >= 0 and rows[y_index] & (mask << pos_x if pos_x >= 0 else mask >> -pos_x):
+                return False
+        return True
+
+    def landing_row(self, shape, pos_x, pos_y):
+        """Returns the row where a shape placed at (pos_x, pos_y) lands when dropped
+
+        Computed from the column tops and the bottom of the shape, falling
+        back to a scan when the piece is under an overhang of the stack."""
+        tops = self.tops
+        landing = ROWS
+        for d_x, d_y in shape.bottom:
+            y_index = tops[pos_x + d_x] - 1 - d_y
+            if y_index < landing:
+                landing = y_index
+        if landing >= pos_y:
+            return landing
+        while self.fits(shape, pos_x, pos_y + 1):
+            pos_y += 1
+        return pos_y
+
+    def merge(self, shape, pos_x, pos_y, color):
+        """Merges a piece shape placed at (pos_x, pos_y) into the platform"""
+        rows = self.rows
+        colors = self.colors
+        for d_y, mask in shape.rows:
+            y_index = pos_y + d_y
+            if y_index >= 0:
+                rows[y_index] |= mask << pos_x if pos_x >= 0 else mask >> -pos_x
+        tops = self.tops
+        height = self.__height
+        cells = self.cells
+        for d_x, d_y in shape.cells:
+            y_index = pos_y + d_y
+            if y_index >= 0:
+                colors[y_index * COLS + pos_x + d_x] = color
+                cells += 1
+                if y_index < tops[pos_x + d_x]:
+                    height += tops[pos_x + d_x] - y_index
+                    tops[pos_x + d_x] = y_index
+        self.__height = height
+        self.cells = cells
+        first = max(pos_y + shape.rows[0][0], 0)
+        last = pos_y + shape.rows[-1][0]
+        if last >= 0:
+            self.__dirty_rows |= ((1 << (last - first + 1)) - 1) << first
+            self.__dirty_columns |= ((1 << (shape.max_dx - shape.min_dx + 1)) - 1) <<\
+                (pos_x + shape.min_dx)
+
+    def get_lines(self):
+        """Returns the indexes of the completed rows"""
+        return [y_index for y_index, row in enumerate(self.rows) if row == FULL_MASK]
+
+    def break_lines(self, lines):
+        """Removes the given rows and drops the rows above them
+
+        The surviving rows are compacted in place, one slice move per run of
+        rows between two cleared ones; the storage of the cleared rows is then
+        reused as empty rows at the top. The row features move with their
+        rows, only the rows that got a new neighbour and the columns whose
+        top was cleared are marked."""
+        if not lines:
+            return
+        rows = self.rows
+        transitions = self.__row_transitions
+        boundaries = self.__boundaries
+        dirty = self.__dirty_rows
+        # Marks of the surviving rows at their final index
+        moved = 0
+        shift = 0
+        end = ROWS
+        with memoryview(self.colors) as colors:
+            for y_index in sorted(lines, reverse=True):
+                # Dropping the rows between this cleared row and the previous one
+                if y_index + 1 < end:
+                    count = end - y_index - 1
+                    # The first of them gets a new upper neighbour
+                    moved |= (((dirty >> (y_index + 1)) & ((1 << count) - 1)) | 1) <<\
+                        (y_index + 1 + shift)
+                    if shift:
+                        rows[y_index + 1 + shift:end + shift] = rows[y_index + 1:end]
+                        transitions[y_index + 1 + shift:end + shift] = transitions[y_index + 1:end]
+                        boundaries[y_index + 1 + shift:end + shift] = boundaries[y_index + 1:end]
+                        colors[(y_index + 1 + shift) * COLS:(end + shift) * COLS] =\
+                            colors[(y_index + 1) * COLS:end * COLS]
+                elif end == ROWS:
+                    # The bottom row was cleared, the new one lies on the floor
+                    moved |= 1 << (ROWS - 1)
+                shift += 1
+                end = y_index
+            if end:
+                moved |= (dirty & ((1 << end) - 1)) << shift
+                rows[shift:end + shift] = rows[:end]
+                transitions[shift:end + shift] = transitions[:end]
+                boundaries[shift:end + shift] = boundaries[:end]
+                colors[shift * COLS:(end + shift) * COLS] = colors[:end * COLS]
+            for y_index in range(shift):
+                rows[y_index] = EMPTY
+                transitions[y_index] = EMPTY_TRANSITIONS
+                boundaries[y_index] = 0
+            colors[:shift * COLS] = EMPTY_COLORS[:shift * COLS]
+        # The first surviving row is now under an empty row
+        self.__dirty_rows = moved | (1 << shift if shift < ROWS else 0)
+        # The tops above the cleared rows drop by shift, which changes neither
+        # the bumpiness nor the wells: only the columns whose top was cleared
+        # are scanned and marked
+        first_line = min(lines)
+        tops = self.tops
+        columns = 0
+        for x_index in range(COLS):
+            if tops[x_index] >= first_line:
+                columns |= 1 << x_index
+            else:
+                tops[x_index] += shift
+        self.__dirty_columns |= columns
+        self.cells -= shift * COLS
+        self.__update_tops(shift, columns)
+
+    def add_garbage(self, count, hole, color=GARBAGE_COLOR):
+        """Pushes the rows up and fills the count bottom rows except the hole column,
+        returns False if occupied rows were pushed out of the top"""
+        count = min(count, ROWS)
+        rows = self.rows
+        overflow = any(rows[:count])
+        rows[:] = rows[count:] + [FULL_MASK & ~(1 << hole)] * count
+        line = bytearray([color]) * COLS
+        line[hole] = EMPTY
+        self.colors[:] = self.colors[count * COLS:] + line * count
+        self.update_features()
+        return not overflow
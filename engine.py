@@ -0,0 +1,331 @@
+"""
+    Title       : Tetris Game - Headless Engine
+"""
+from random import Random
+from time import perf_counter
+
+from board import Board
+from pieces import RANDOMIZERS, PiecePool
+from timing import BREAK_LINES, COLLISION, MERGE
+
+LINES_LEVEL_UP = 4 # Chaque 4 ligne le joueur gagne un niveau
+DELAY = 500
+SPEED_UP_DELAY = 25
+MIN_DELAY = 50
+LEVEL_DELAY_STEP = 80
+# Following: Original BPS scoring system
+LINE_SCORES = (0, 40, 100, 300, 1200)
+
+ACTION_LEFT = 'left'
+ACTION_RIGHT = 'right'
+ACTION_ROTATE = 'rotate'
+ACTION_HARD_DROP = 'hard_drop'
+ACTION_SOFT_DROP = 'soft_drop'
+MOVES = (ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE)
+ACTIONS = MOVES + (ACTION_HARD_DROP,)
+KEY_ACTIONS = {'Left': ACTION_LEFT, 'Right': ACTION_RIGHT, 'Up': ACTION_ROTATE,\
+    'space': ACTION_HARD_DROP}
+CONTROL_KEYS = dict(KEY_ACTIONS, Down=ACTION_SOFT_DROP)
+RELEASE_PREFIX = 'KeyRelease-'
+
+# Input sampling: one logic frame every LOGIC_FRAME_MS, held moves repeat
+# after the delayed auto shift (DAS) every auto repeat rate (ARR) ms
+LOGIC_FRAME_MS = 16
+DAS = 170
+ARR = 50
+
+def clamp(value, min_val, max_val):
+    """clamp a value"""
+
+    if value <= min_val:
+        return min_val
+    if value >= max_val:
+        return  max_val
+    return value
+
+class Player:
+    """Class describes the player data structure"""
+
+    __slots__ = ('__player_name', '__score')
+
+    def __init__(self, player_name):
+        self.__player_name = player_name
+        self.__score = 0
+
+    def get_player_name(self):
+        """Returns the player's name"""
+        return self.__player_name
+
+    def get_score(self):
+        """Returns the player's score"""
+        return self.__score
+
+    def add_score(self, value):
+        """Adds a value the player's score"""
+        self.__score += value
+
+    def set_score(self, score):
+        """Sets the player's score"""
+        self.__score = score
+
+class GameState:
+    """Game rules without any display: gravity, merge, line clears, scoring and leveling"""
+
+    def __init__(self, player=None, seed=None, timings=None, randomizer='bag'):
+        self.player = player if player is not None else Player('CPU')
+        self.seed = seed if seed is not None else Random().getrandbits(32)
+        self.randomizer = randomizer
+        self.timings = timings
+        self.board = Board()
+        self.lines = 0
+        self.level = 1
+        self.ticks = 0
+        self.pieces = 0
+        self.is_over = False
+        self.is_speed_up = False
+        # Bumped whenever the platform, the next piece or the scores change
+        self.revision = 0
+        self.__delay = DELAY
+        self.__randomizer = RANDOMIZERS[randomizer](self.seed)
+        self.__pool = PiecePool()
+        self.current_piece = self.__select_random_piece()
+        self.next_piece = self.__select_random_piece()
+
+    def __select_random_piece(self):
+        """Returns a random piece"""
+        return self.__pool.acquire(self.__randomizer.next())
+
+    def get_preview(self, count=None):
+        """Returns the types of the pieces coming after the next piece"""
+        return self.__randomizer.preview(count)
+
+    def get_delay(self):
+        """Returns the delay in ms until the next tick"""
+        if self.is_speed_up:
+            return SPEED_UP_DELAY
+        return self.__delay
+
+    def set_speed_up(self, is_speed_up):
+        """Enables or disables the soft drop speed"""
+        self.is_speed_up = is_speed_up
+
+    def add_garbage(self, count, hole):
+        """Adds count garbage rows under the platform, pushing the current piece up if needed"""
+        if self.is_over or count <= 0:
+            return
+        self.revision += 1
+        if not self.board.add_garbage(count, hole):
+            self.is_over = True
+            return
+        piece = self.current_piece
+        shape = piece.get_shape()
+        while not self.board.fits(shape, piece.pos_x, piece.pos_y):
+            if piece.pos_y + shape.rows[0][0] < 0:
+                self.is_over = True
+                return
+            piece.pos_y -= 1
+
+    def get_features(self):
+        """Returns the cached Features of the platform (holes, transitions, bumpiness, wells...)"""
+        return self.board.get_features()
+
+    def get_ghost_row(self):
+        """Returns the row where the current piece would land if dropped"""
+        piece = self.current_piece
+        return self.board.landing_row(piece.get_shape(), piece.pos_x, piece.pos_y)
+
+    def step(self, action):
+        """Applies a player action to the current piece, returns True if the piece moved"""
+        if self.is_over:
+            return False
+        piece = self.current_piece
+        if action == ACTION_HARD_DROP:
+            # Dropping and locking the piece at once
+            piece.pos_y = self.get_ghost_row()
+            self.__lock()
+            return True
+        pos_x, rotation = piece.pos_x, piece.rotation
+        if action == ACTION_LEFT:
+            piece.move_left(self.board)
+        elif action == ACTION_RIGHT:
+            piece.move_right(self.board)
+        elif action == ACTION_ROTATE:
+            piece.rotate(self.board)
+        return piece.pos_x != pos_x or piece.rotation != rotation
+
+    def tick(self):
+        """Creates a game cycle, returns the number of lines broken"""
+        if self.is_over:
+            return 0
+        self.ticks += 1
+        timings = self.timings
+        piece = self.current_piece
+        # Checking if the current piece is colliding with the platform
+        if timings:
+            start = perf_counter()
+        falling = self.board.fits(piece.get_shape(), piece.pos_x, piece.pos_y + 1)
+        if timings:
+            timings.record(COLLISION, perf_counter() - start)
+        if falling:
+            # Moving down the current piece by one block
+            piece.gravity()
+            return 0
+        return self.__lock()
+
+    def __lock(self):
+        """Merges the current piece, breaks the lines and spawns the next piece,
+        returns the number of lines broken"""
+        timings = self.timings
+        # Merging the current piece with the platform
+        if timings:
+            start = perf_counter()
+        self.__merge_current_piece()
+        if timings:
+            timings.record(MERGE, perf_counter() - start)
+        # Searching for completed lines
+        lines = self.board.get_lines()
+        if lines:
+            self.lines += len(lines)
+            # Clearing the lines
+            if timings:
+                start = perf_counter()
+            self.__break_lines(lines)
+            if timings:
+                timings.record(BREAK_LINES, perf_counter() - start)
+            # Leveling UP
+            self.__level_up()
+        # Setting the current piece and generating a new next piece
+        self.__pool.release(self.current_piece)
+        self.current_piece = self.next_piece
+        self.next_piece = self.__select_random_piece()
+        self.revision += 1
+        # Checking if the spawned piece is overlapping on another piece
+        if self.__check_game_over():
+            self.is_over = True
+        return len(lines)
+
+    def __merge_current_piece(self):
+        """Merges the current piece with the platform"""
+        piece = self.current_piece
+        shape = piece.get_shape()
+        self.board.merge(shape, piece.pos_x, piece.pos_y, piece.get_color_code())
+        self.pieces += 1
+        # A piece locked above the top limit ends the game
+        if piece.pos_y + shape.rows[0][0] < 0:
+            self.is_over = True
+
+    def __break_lines(self, lines):
+        """Breaking the lines and rewarding the player"""
+        self.player.add_score(LINE_SCORES[len(lines)] * self.level)
+        self.board.break_lines(lines)
+
+    def __level_up(self):
+        """ Checking for level up, if so levels up the player"""
+        temp = self.lines // LINES_LEVEL_UP
+
+        if temp >= 1 and temp + 1 != self.level:
+            self.level = temp + 1
+            self.__delay = clamp(self.__delay - LEVEL_DELAY_STEP, MIN_DELAY, self.__delay)
+
+    def __check_game_over(self):
+        """Checks if the spawned piece is overlapping on another piece"""
+        piece = self.current_piece
+        return self.is_over or not self.board.fits(piece.get_shape(), piece.pos_x, piece.pos_y)
+
+class Controller:
+    """Keyboard state of a game sampled once per logic frame
+
+    Shifts repeat after DAS ms every ARR ms (ARR 0 moves to the wall), a
+    rotation or a hard drop needs a new press, gravity runs from the frames elapsed. The
+    OS key repeat is ignored, so the speed only depends on the settings."""
+
+    __slots__ = ('state', 'das', 'arr', 'frame_ms', 'frames', '__held', '__was_held',\
+        '__pressed', '__queued', '__direction', '__charge', '__gravity')
+
+    def __init__(self, state, das=DAS, arr=ARR, frame_ms=LOGIC_FRAME_MS):
+        self.state = state
+        self.das = das
+        self.arr = arr
+        self.frame_ms = frame_ms
+        self.frames = 0
+        self.__held = set()
+        self.__was_held = set()
+        self.__pressed = []
+        self.__queued = []
+        self.__direction = None
+        self.__charge = 0
+        self.__gravity = 0
+
+    def press(self, action):
+        """Marks a control as held, a key already held is an OS repeat and ignored"""
+        if action not in self.__held:
+            self.__held.add(action)
+            self.__pressed.append(action)
+
+    def release(self, action):
+        """Marks a control as released"""
+        self.__held.discard(action)
+
+    def queue(self, action):
+        """Applies an action once at the next frame, whatever the keyboard state"""
+        self.__queued.append(action)
+
+    def frame(self):
+        """Runs one logic frame: the sampled input then gravity, returns True if the state changed"""
+        state = self.state
+        self.frames += 1
+        if state.is_over:
+            return False
+        changed = False
+        held, was_held, pressed = self.__held, self.__was_held, self.__pressed
+        for action in self.__queued:
+            changed |= state.step(action)
+        self.__queued.clear()
+        # A release and press in the same frame is an OS repeat, not a new press
+        new = [action for action in pressed if action not in was_held]
+        if ACTION_ROTATE in new:
+            changed |= state.step(ACTION_ROTATE)
+        if ACTION_HARD_DROP in new:
+            self.__gravity = 0
+            changed |= state.step(ACTION_HARD_DROP)
+        changed |= self.__shift(new)
+        soft_drop = ACTION_SOFT_DROP in held or ACTION_SOFT_DROP in new
+        if soft_drop != state.is_speed_up:
+            state.set_speed_up(soft_drop)
+            self.__gravity = min(self.__gravity, state.get_delay())
+        self.__was_held = set(held)
+        pressed.clear()
+        # Gravity
+        self.__gravity += self.frame_ms
+        delay = state.get_delay()
+        while self.__gravity >= delay and not state.is_over:
+            self.__gravity -= delay
+            state.tick()
+            changed = True
+            delay = state.get_delay()
+        return changed
+
+    def __shift(self, new):
+        """Moves the piece for the held direction, the last pressed one wins"""
+        state = self.state
+        shifts = [action for action in new if action in (ACTION_LEFT, ACTION_RIGHT)]
+        if shifts:
+            self.__direction = shifts[-1]
+            self.__charge = 0
+            return state.step(self.__direction)
+        if self.__direction not in self.__held:
+            others = [action for action in (ACTION_LEFT, ACTION_RIGHT) if action in self.__held]
+            self.__direction = others[0] if others else None
+            self.__charge = 0
+            return False
+        self.__charge += self.frame_ms
+        changed = False
+        if self.arr <= 0:
+            if self.__charge >= self.das:
+                while state.step(self.__direction):
+                    changed = True
+            return changed
+        while self.__charge >= self.das:
+            self.__charge -= self.arr
+            changed |= state.step(self.__direction)
+        return changed
@@ -0,0 +1,185 @@
+"""
+    Title       : Tetris Game - Pieces
+"""
+from abc import ABC, abstractmethod
+from collections import deque, namedtuple
+from itertools import islice
+from random import Random
+
+PIECE_TYPES = ('O', 'I', 'S', 'Z', 'L', 'J', 'T')
+
+# Every rotation state is listed as the (row, col) cells of the piece inside
+# its 4x4 box, the pivot point being the first cell when there is one.
+ROTATIONS = {
+    'O': (((2, 1), (2, 2), (3, 1), (3, 2)),),
+    'I': (((1, 2), (1, 0), (1, 1), (1, 3)),
+          ((1, 2), (0, 2), (2, 2), (3, 2))),
+    'S': (((1, 2), (2, 1), (2, 2), (1, 3)),
+          ((1, 2), (1, 3), (0, 2), (2, 3))),
+    'Z': (((1, 2), (1, 1), (2, 2), (2, 3)),
+          ((1, 2), (2, 2), (1, 3), (0, 3))),
+    'L': (((1, 2), (1, 1), (2, 1), (1, 3)),
+          ((1, 2), (0, 2), (2, 2), (2, 3)),
+          ((1, 2), (1, 1), (1, 3), (0, 3)),
+          ((1, 2), (0, 1), (0, 2), (2, 2))),
+    'J': (((1, 2), (1, 1), (1, 3), (2, 3)),
+          ((1, 2), (0, 2), (0, 3), (2, 2)),
+          ((1, 2), (0, 1), (1, 1), (1, 3)),
+          ((1, 2), (0, 2), (2, 1), (2, 2))),
+    'T': (((1, 2), (1, 1), (1, 3), (2, 2)),
+          ((1, 2), (1, 3), (2, 2), (0, 2)),
+          ((1, 2), (1, 3), (0, 2), (1, 1)),
+          ((1, 2), (0, 2), (1, 1), (2, 2))),
+}
+
+PREVIEW_SIZE = 5
+
+# Row of the platform where the top of the 4x4 box spawns
+SPAWN_ROWS = {'O': -2, 'S': -2, 'Z': -2, 'T': -2, 'L': -1, 'J': -1, 'I': 0}
+
+# Immutable rotation state shared by every piece of a type
+#   cells  : (dx, dy) offsets of the 4 cells from the box origin
+#   rows   : (dy, mask) bitmask of every row covered by the piece, bit dx set
+#   min_dx : leftmost column offset
+#   max_dx : rightmost column offset
+#   bottom : (dx, dy) lowest cell of every column covered by the piece
+Shape = namedtuple('Shape', ['cells', 'rows', 'min_dx', 'max_dx', 'bottom'])
+
+def build_shape(cells):
+    """Builds the shape of a rotation state from its (row, col) cells"""
+    offsets = tuple((col, row) for row, col in cells)
+    masks = {}
+    for d_x, d_y in offsets:
+        masks[d_y] = masks.get(d_y, 0) | (1 << d_x)
+    bottom = {}
+    for d_x, d_y in offsets:
+        bottom[d_x] = max(bottom.get(d_x, d_y), d_y)
+    columns = [d_x for d_x, _ in offsets]
+    return Shape(offsets, tuple(sorted(masks.items())), min(columns), max(columns),\
+        tuple(sorted(bottom.items())))
+
+SHAPES = {piece_type: tuple(build_shape(cells) for cells in rotations)\
+    for piece_type, rotations in ROTATIONS.items()}
+
+class Piece:
+    """Piece Structure Class: a type, a rotation index and an origin"""
+
+    __slots__ = ('piece_type', 'shapes', 'rotation', 'pos_x', 'pos_y')
+
+    def __init__(self, piece_type):
+        self.reset(piece_type)
+
+    def reset(self, piece_type):
+        """Turns the piece into a freshly spawned piece of the given type"""
+        self.piece_type = piece_type
+        self.shapes = SHAPES[piece_type]
+        self.rotation = 0
+        self.pos_x = 0
+        self.pos_y = SPAWN_ROWS[piece_type]
+
+    def get_shape(self):
+        """Returns the current rotation state"""
+        return self.shapes[self.rotation]
+
+    def get_cells(self):
+        """Returns the (x, y) platform cells covered by the piece"""
+        return [(self.pos_x + d_x, self.pos_y + d_y) for d_x, d_y in self.shapes[self.rotation].cells]
+
+    def get_color_code(self):
+        """Returns the code used to store the piece color in the platform"""
+        return PIECE_TYPES.index(self.piece_type) + 1
+
+    def gravity(self):
+        """moves the piece down by one block"""
+        self.pos_y += 1
+
+    def check_movement(self, direction, board):
+        """Checking if movement is safe or not"""
+        return board.fits(self.shapes[self.rotation], self.pos_x + direction, self.pos_y)
+
+    def move_right(self, board):
+        """Moves the piece to the right"""
+        if self.check_movement(1, board):
+            self.pos_x += 1
+
+    def move_left(self, board):
+        """Moves the piece to the left"""
+        if self.check_movement(-1, board):
+            self.pos_x -= 1
+
+    def rotate(self, board):
+        """Rotates the piece if the next rotation state fits"""
+        rotation = (self.rotation + 1) % len(self.shapes)
+        if board.fits(self.shapes[rotation], self.pos_x, self.pos_y):
+            self.rotation = rotation
+
+class PiecePool:
+    """Recycles the pieces of a game instead of building one per spawn"""
+
+    __slots__ = ('__free',)
+
+    def __init__(self):
+        self.__free = []
+
+    def acquire(self, piece_type):
+        """Returns a spawned piece of the given type, reusing a released one if any"""
+        if self.__free:
+            piece = self.__free.pop()
+            piece.reset(piece_type)
+            return piece
+        return Piece(piece_type)
+
+    def release(self, piece):
+        """Gives back a piece that is not used anymore"""
+        self.__free.append(piece)
+
+class Randomizer(ABC):
+    """Seedable stream of piece types served from a pregenerated buffer
+
+    Subclasses generate() a chunk of types at a time; the buffer holds the
+    preview queue plus at most one chunk, so that every game state stays
+    small."""
+
+    def __init__(self, seed=None, preview_size=PREVIEW_SIZE):
+        self.rng = Random(seed)
+        self.preview_size = preview_size
+        self.__queue = deque()
+        self.__fill(preview_size)
+
+    @abstractmethod
+    def generate(self):
+        """Returns the next chunk of piece types"""
+
+    def __fill(self, count):
+        """Generates chunks until the buffer holds count types"""
+        queue = self.__queue
+        while len(queue) < count:
+            queue.extend(self.generate())
+
+    def next(self):
+        """Returns the next piece type"""
+        if len(self.__queue) <= self.preview_size:
+            self.__fill(self.preview_size + 1)
+        return self.__queue.popleft()
+
+    def preview(self, count=None):
+        """Returns the upcoming piece types without consuming them"""
+        count = self.preview_size if count is None else count
+        self.__fill(count)
+        return tuple(islice(self.__queue, count))
+
+class BagRandomizer(Randomizer):
+    """7-bag: every run of 7 pieces holds each piece type once"""
+
+    def generate(self):
+        bag = list(PIECE_TYPES)
+        self.rng.shuffle(bag)
+        return bag
+
+class UniformRandomizer(Randomizer):
+    """Classic generator: every piece type is drawn independently"""
+
+    def generate(self):
+        return self.rng.choices(PIECE_TYPES, k=7)
+
+RANDOMIZERS = {'bag': BagRandomizer, 'uniform': UniformRandomizer}
@@ -0,0 +1,129 @@
+"""
+    Title       : Tetris Game - Renderer
+"""
+from board import COLS, ROWS
+
+BLOCK_SIZE = 30
+COLORS = ['white', 'yellow', 'cyan', 'red', 'green', 'orange', '#ff1493', 'magenta', 'gray']
+# Offsets (in blocks) of the next piece preview from its spawn position
+PREVIEW_OFFSETS = {'I': (13, 13), 'L': (13, 13), 'J': (13, 13)}
+PREVIEW_DEFAULT_OFFSET = (12, 14)
+
+def cell_coords(x_index, y_index):
+    """Returns the canvas rectangle of a platform cell"""
+    return (x_index*BLOCK_SIZE, y_index*BLOCK_SIZE,\
+        (x_index+1)*BLOCK_SIZE, (y_index+1)*BLOCK_SIZE)
+
+class Renderer:
+    """Draws a game state on a canvas using persistent canvas items
+
+    Every item (one rectangle per platform cell, the piece, its ghost, the
+    preview and the HUD labels) is created once; each frame only reconfigures
+    the items whose value changed since the previous frame."""
+
+    def __init__(self, canvas, background=None):
+        self.canvas = canvas
+        if background is not None:
+            canvas.create_image(0, 0, anchor='nw', image=background)
+        self.__cells = [canvas.create_rectangle(*cell_coords(index % COLS, index // COLS),\
+            fill=COLORS[0], state='hidden') for index in range(ROWS * COLS)]
+        self.__drawn = bytearray(ROWS * COLS)
+        self.__ghost_items = [canvas.create_rectangle(0, 0, 0, 0, fill='', state='hidden')\
+            for _ in range(4)]
+        self.__piece_items = [canvas.create_rectangle(0, 0, 0, 0, state='hidden') for _ in range(4)]
+        self.__preview_items = [canvas.create_rectangle(0, 0, 0, 0, state='hidden') for _ in range(4)]
+        self.__drawn_piece = None
+        self.__drawn_ghost = None
+        self.__drawn_preview = None
+        self.__name_text = canvas.create_text(425, 10, fill='white', font=('Arial', 10))
+        self.__score_text = canvas.create_text(425, 117, fill='white', font=('Arial', 15))
+        self.__lines_text = canvas.create_text(454, 332, fill='white', font=('Arial', 15))
+        self.__level_text = canvas.create_text(454, 240, fill='white', font=('Arial', 15))
+        self.__drawn_labels = {}
+        self.__drawn_revision = None
+
+    def draw(self, state):
+        """Updates the canvas items that changed since the last frame
+
+        The platform, the preview and the HUD only change with the state
+        revision, an idle frame only looks at the current piece."""
+        piece = state.current_piece
+        if state.revision != self.__drawn_revision:
+            self.__draw_platform(state.board)
+            self.__draw_next_piece(state.next_piece)
+            self.__draw_ui(state)
+            self.__drawn_revision = state.revision
+        elif self.__drawn_piece == (piece.piece_type, piece.rotation, piece.pos_x, piece.pos_y):
+            return
+        self.__draw_ghost_piece(piece, state.get_ghost_row())
+        self.__draw_current_piece(piece)
+
+    def __draw_platform(self, board):
+        """Reconfigures the platform cells whose color changed"""
+        colors = board.colors
+        drawn = self.__drawn
+        if colors == drawn:
+            return
+        canvas = self.canvas
+        for index, color in enumerate(colors):
+            if color != drawn[index]:
+                if color:
+                    canvas.itemconfig(self.__cells[index], fill=COLORS[color], state='normal')
+                else:
+                    canvas.itemconfig(self.__cells[index], state='hidden')
+        drawn[:] = colors
+
+    def __move_piece_items(self, items, piece, off_x, off_y):
+        """Moves the 4 rectangles of a piece to its cells"""
+        for item, (x_index, y_index) in zip(items, piece.get_cells()):
+            self.canvas.coords(item, *cell_coords(x_index + off_x, y_index + off_y))
+
+    def __set_piece_color(self, items, piece):
+        """Colors and shows the 4 rectangles of a piece"""
+        for item in items:
+            self.canvas.itemconfig(item, fill=COLORS[piece.get_color_code()], state='normal')
+
+    def __draw_current_piece(self, piece):
+        """Moves the current piece items if the piece moved"""
+        key = (piece.piece_type, piece.rotation, piece.pos_x, piece.pos_y)
+        drawn = self.__drawn_piece
+        if key == drawn:
+            return
+        if drawn is None or drawn[0] != key[0]:
+            self.__set_piece_color(self.__piece_items, piece)
+        self.__move_piece_items(self.__piece_items, piece, 0, 0)
+        self.__drawn_piece = key
+
+    def __draw_ghost_piece(self, piece, ghost_row):
+        """Outlines the landing cells of the current piece if they changed"""
+        key = (piece.piece_type, piece.rotation, piece.pos_x, ghost_row)
+        drawn = self.__drawn_ghost
+        if key == drawn:
+            return
+        if drawn is None or drawn[0] != key[0]:
+            for item in self.__ghost_items:
+                self.canvas.itemconfig(item, outline=COLORS[piece.get_color_code()], state='normal')
+        self.__move_piece_items(self.__ghost_items, piece, 0, ghost_row - piece.pos_y)
+        self.__drawn_ghost = key
+
+    def __draw_next_piece(self, piece):
+        """Redraws the preview when the next piece changes"""
+        if piece.piece_type == self.__drawn_preview:
+            return
+        off_x, off_y = PREVIEW_OFFSETS.get(piece.piece_type, PREVIEW_DEFAULT_OFFSET)
+        self.__set_piece_color(self.__preview_items, piece)
+        self.__move_piece_items(self.__preview_items, piece, off_x, off_y)
+        self.__drawn_preview = piece.piece_type
+
+    def __set_label(self, item, value):
+        """Updates a HUD label if its value changed"""
+        if self.__drawn_labels.get(item) != value:
+            self.canvas.itemconfig(item, text='{}'.format(value))
+            self.__drawn_labels[item] = value
+
+    def __draw_ui(self, state):
+        """Updates the ui (player name, score, level, lines)"""
+        self.__set_label(self.__name_text, state.player.get_player_name())
+        self.__set_label(self.__score_text, state.player.get_score())
+        self.__set_label(self.__lines_text, state.lines)
+        self.__set_label(self.__level_text, state.level)
@@ -0,0 +1,257 @@
+"""
+    Title       : Tetris Game - Replays
+
+    Records the (logic frame, key) events of a seeded session and replays
+    them headlessly as fast as possible:
+        python replay.py replay.bin [more.bin ...]
+
+    Binary format, little endian:
+        header  : HEADER struct (magic, version, board size, seed, rules),
+                  varint length and UTF-8 bytes of the player name
+        events  : varint frame delta from the previous event, varint key code
+        trailer : RESULTS struct (final results), CRC32 of everything before
+"""
+import mmap
+import struct
+import zlib
+from argparse import ArgumentParser
+from sys import exit
+from time import perf_counter
+
+from board import COLS, ROWS
+from engine import ACTIONS, CONTROL_KEYS, RELEASE_PREFIX, Controller, GameState, Player
+
+REPLAY_VERSION = 4
+MAGIC = b'TRPL'
+# magic, version, rows, cols, seed, randomizer code, das, arr, frame_ms
+HEADER = struct.Struct('<4sHBBQBHHH')
+# score, lines, level, ticks
+RESULTS = struct.Struct('<QIHQ')
+CHECKSUM = struct.Struct('<I')
+CHUNK_EVENTS = 1024
+
+# The codes are part of the file format: new keys are only ever appended
+EVENT_KEYS = ('Left', 'Right', 'Up', 'space', 'Down',\
+    'KeyRelease-Left', 'KeyRelease-Right', 'KeyRelease-Up', 'KeyRelease-space', 'KeyRelease-Down',\
+    'left', 'right', 'rotate', 'hard_drop', 'Escape')
+EVENT_CODES = {key: code for code, key in enumerate(EVENT_KEYS)}
+RANDOMIZERS = ('bag', 'uniform')
+
+def write_varint(buffer, value):
+    """Appends an unsigned LEB128 varint to a bytearray"""
+    while value >= 0x80:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def read_varint(buffer, offset):
+    """Decodes the varint at an offset of a buffer, returns (value, next offset)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def encode(session):
+    """Streaming writer: yields the bytes of a session chunk by chunk
+
+    The events of the session may be any iterable of (frame, key), they
+    are consumed lazily."""
+    name = session['player'].encode('utf-8')
+    chunk = bytearray(HEADER.pack(MAGIC, REPLAY_VERSION, ROWS, COLS, session['seed'],\
+        RANDOMIZERS.index(session['randomizer']), session['das'], session['arr'],\
+        session['frame_ms']))
+    write_varint(chunk, len(name))
+    chunk += name
+    checksum = 0
+    count = 0
+    previous = 0
+    for frame, key in session['events']:
+        write_varint(chunk, frame - previous)
+        write_varint(chunk, EVENT_CODES[key])
+        previous = frame
+        count += 1
+        if count == CHUNK_EVENTS:
+            checksum = zlib.crc32(chunk, checksum)
+            yield bytes(chunk)
+            chunk.clear()
+            count = 0
+    final = session['final']
+    chunk += RESULTS.pack(final['score'], final['lines'], final['level'], final['ticks'])
+    chunk += CHECKSUM.pack(zlib.crc32(chunk, checksum))
+    yield bytes(chunk)
+
+def save(session, path):
+    """Writes a session to a binary replay file"""
+    with open(path, 'wb') as output:
+        for chunk in encode(session):
+            output.write(chunk)
+
+class Recorder:
+    """Captures the keys of a session with the logic frame they were sampled at
+
+    Keys are key presses, RELEASE_PREFIX + key releases, or actions queued
+    directly by the autoplayer."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.state = controller.state
+        self.events = []
+
+    def record(self, key):
+        """Records a key at the current frame of the game"""
+        self.events.append((self.controller.frames, key))
+
+    def as_dict(self):
+        """Returns the session: seed, input settings, events and final results"""
+        state = self.state
+        controller = self.controller
+        return {'version': REPLAY_VERSION,\
+            'seed': state.seed,\
+            'randomizer': state.randomizer,\
+            'das': controller.das,\
+            'arr': controller.arr,\
+            'frame_ms': controller.frame_ms,\
+            'player': state.player.get_player_name(),\
+            'events': self.events,\
+            'final': {'score': state.player.get_score(), 'lines': state.lines,\
+                'level': state.level, 'ticks': state.ticks}}
+
+    def save(self, path):
+        """Writes the session to a binary replay file"""
+        save(self.as_dict(), path)
+
+class ReplayReader:
+    """Memory-mapped replay file: the header and the final results are read
+    when opened, the events are decoded lazily while iterating"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as replay_file:
+            self.__buffer = mmap.mmap(replay_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.__read_header(path)
+        except (IndexError, UnicodeDecodeError):
+            # Corrupted bytes decoded before the checksum is checked
+            self.__buffer.close()
+            raise ValueError('{}: corrupted replay header'.format(path)) from None
+        except ValueError:
+            self.__buffer.close()
+            raise
+
+    def __read_header(self, path):
+        """Decodes the header and the final results, raises ValueError if they are invalid"""
+        buffer = self.__buffer
+        if len(buffer) < HEADER.size + RESULTS.size + CHECKSUM.size:
+            raise ValueError('{}: truncated replay'.format(path))
+        magic, version, rows, cols, seed, randomizer, das, arr, frame_ms =\
+            HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != REPLAY_VERSION or (rows, cols) != (ROWS, COLS):
+            raise ValueError('{}: not a version {} replay of a {}x{} board'.format(\
+                path, REPLAY_VERSION, ROWS, COLS))
+        length, offset = read_varint(buffer, HEADER.size)
+        self.__events_start = offset + length
+        self.__events_end = len(buffer) - RESULTS.size - CHECKSUM.size
+        if self.__events_start > self.__events_end:
+            raise ValueError('{}: truncated replay'.format(path))
+        score, lines, level, ticks = RESULTS.unpack_from(buffer, self.__events_end)
+        self.checksum = CHECKSUM.unpack_from(buffer, len(buffer) - CHECKSUM.size)[0]
+        self.header = {'version': version, 'seed': seed, 'randomizer': RANDOMIZERS[randomizer],\
+            'das': das, 'arr': arr, 'frame_ms': frame_ms,\
+            'player': buffer[offset:self.__events_start].decode('utf-8')}
+        self.final = {'score': score, 'lines': lines, 'level': level, 'ticks': ticks}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmaps the file"""
+        self.__buffer.close()
+
+    def is_valid(self):
+        """Checks the CRC32 of the file"""
+        with memoryview(self.__buffer) as data:
+            return zlib.crc32(data[:-CHECKSUM.size]) == self.checksum
+
+    def events(self):
+        """Yields the (frame, key) events, decoded from the mapped file on demand"""
+        buffer = self.__buffer
+        offset = self.__events_start
+        end = self.__events_end
+        frame = 0
+        while offset < end:
+            delta, offset = read_varint(buffer, offset)
+            code, offset = read_varint(buffer, offset)
+            frame += delta
+            yield frame, EVENT_KEYS[code]
+
+    def as_session(self):
+        """Returns the session read by replay(), its events being decoded lazily"""
+        return dict(self.header, events=self.events(), final=self.final)
+
+def load(path):
+    """Opens a replay written by Recorder.save, raises ValueError if it is corrupted"""
+    reader = ReplayReader(path)
+    if not reader.is_valid():
+        reader.close()
+        raise ValueError('{}: checksum mismatch'.format(path))
+    return reader
+
+def replay(session):
+    """Re-executes a session headlessly, returns the final game state"""
+    state = GameState(Player(session['player']), session['seed'],\
+        randomizer=session.get('randomizer', 'bag'))
+    controller = Controller(state, session['das'], session['arr'], session['frame_ms'])
+    for frame, key in session['events']:
+        while controller.frames < frame and not state.is_over:
+            controller.frame()
+        if key == 'Escape' or state.is_over:
+            break
+        if key in CONTROL_KEYS:
+            controller.press(CONTROL_KEYS[key])
+        elif key.startswith(RELEASE_PREFIX):
+            controller.release(CONTROL_KEYS[key[len(RELEASE_PREFIX):]])
+        elif key in ACTIONS:
+            controller.queue(key)
+    else:
+        while not state.is_over:
+            controller.frame()
+    return state
+
+def verify(session):
+    """Replays a session, returns the (expected, replayed) final results"""
+    state = replay(session)
+    replayed = {'score': state.player.get_score(), 'lines': state.lines,\
+        'level': state.level, 'ticks': state.ticks}
+    return session['final'], replayed
+
+def main():
+    """Replay entry point"""
+    parser = ArgumentParser(description='Replays recorded Tetris sessions headlessly')
+    parser.add_argument('paths', nargs='+')
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.paths:
+        with load(path) as reader:
+            start = perf_counter()
+            expected, replayed = verify(reader.as_session())
+            elapsed = perf_counter() - start
+        print('{}: replayed {} ticks in {:.3f} s ({:,.0f} ticks/s)'.format(path,\
+            replayed['ticks'], elapsed, replayed['ticks'] / elapsed if elapsed else 0))
+        for name in expected:
+            print('{:<6} expected {:>10} replayed {:>10}'.format(name, expected[name], replayed[name]))
+        if expected != replayed:
+            print('MISMATCH')
+            failed = True
+    if failed:
+        exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+    Title       : Tetris Game - Game Loop
+
+    Fixed-timestep scheduler: logic ticks follow a perf_counter clock and
+    are caught up when late, rendering is separate and throttled to the
+    display frame rate.
+"""
+from time import perf_counter
+
+from timing import JITTER
+
+FRAME_MS = 16
+MAX_CATCH_UP = 5
+
+class GameLoop:
+    """Runs logic ticks on a fixed timestep and renders at most once per frame
+
+    after(ms, callback) and after_cancel(job) schedule the wake ups (the Tk
+    canvas methods), get_delay() returns the current timestep in ms, tick()
+    runs one logic tick and returns False when the game stopped, render()
+    draws the state. Only the ticks calling invalidate() are rendered, once
+    per frame whatever their count."""
+
+    def __init__(self, after, after_cancel, get_delay, tick, render, timings=None,\
+        frame_ms=FRAME_MS, max_catch_up=MAX_CATCH_UP, clock=perf_counter):
+        self.__after = after
+        self.__after_cancel = after_cancel
+        self.__get_delay = get_delay
+        self.__tick = tick
+        self.__render = render
+        self.timings = timings
+        self.frame_ms = frame_ms
+        self.max_catch_up = max_catch_up
+        self.__clock = clock
+        self.__job = None
+        self.__job_time = None
+        self.__last_tick = None
+        self.__last_render = None
+        self.__dirty = False
+        self.__running = False
+        self.__waking = False
+        self.dropped_ticks = 0
+
+    def start(self):
+        """Starts the loop, the first tick happening one timestep from now"""
+        self.__running = True
+        self.__last_tick = self.__clock()
+        self.__dirty = True
+        self.__wake()
+
+    def stop(self):
+        """Stops the loop and cancels the pending wake up"""
+        self.__running = False
+        if self.__job is not None:
+            self.__after_cancel(self.__job)
+            self.__job = None
+
+    def is_running(self):
+        """Returns True until the loop is stopped"""
+        return self.__running
+
+    def invalidate(self):
+        """Requests a render of the state at the next frame"""
+        if not self.__running:
+            return
+        self.__dirty = True
+        if not self.__waking:
+            self.__schedule(self.__next_frame())
+
+    def __next_frame(self):
+        """Returns the earliest time the next render is allowed"""
+        if self.__last_render is None:
+            return float('-inf')
+        return self.__last_render + self.frame_ms / 1000
+
+    def __schedule(self, wake_time):
+        """Keeps a single pending wake up, moved earlier if needed"""
+        if self.__job is not None:
+            if self.__job_time <= wake_time:
+                return
+            self.__after_cancel(self.__job)
+        delay = max(0, int((wake_time - self.__clock()) * 1000 + 0.999))
+        self.__job_time = wake_time
+        self.__job = self.__after(delay, self.__wake)
+
+    def __wake(self):
+        """Runs the ticks due since the last one, then renders if the state changed"""
+        self.__job = None
+        if not self.__running:
+            return
+        now = self.__clock()
+        due = self.__last_tick + self.__get_delay() / 1000
+        ticks = 0
+        self.__waking = True
+        while now >= due and ticks < self.max_catch_up:
+            if self.timings:
+                self.timings.record(JITTER, now - due)
+            self.__last_tick = due
+            ticks += 1
+            if not self.__tick():
+                self.__waking = False
+                self.stop()
+                return
+            due = self.__last_tick + self.__get_delay() / 1000
+        self.__waking = False
+        if now >= due:
+            # Too late to catch up: dropping the backlog instead of fast forwarding the game
+            delay = self.__get_delay() / 1000
+            self.dropped_ticks += int((now - due) / delay) + 1
+            self.__last_tick = now
+            due = now + delay
+        if self.__dirty and now >= self.__next_frame():
+            self.__render()
+            self.__last_render = now
+            self.__dirty = False
+        wake_time = due
+        if self.__dirty:
+            wake_time = min(wake_time, self.__next_frame())
+        self.__schedule(wake_time)
@@ -0,0 +1,177 @@
+"""
+    Title       : Tetris Game - High Scores
+
+    Append-only log of fixed-size game records with a small sidecar index
+    holding the top scores and the best record of every player, so the
+    leaderboard never parses the whole history:
+        python scores.py
+        python scores.py --player PXCODE
+"""
+import json
+import mmap
+import os
+import struct
+from argparse import ArgumentParser
+from collections import namedtuple
+from time import time
+
+SCORES_FILE = 'scores.log'
+INDEX_SUFFIX = '.idx'
+TOP_SIZE = 10
+NAME_SIZE = 16
+
+# Record: name (UTF-8, zero padded), score, level, lines, timestamp, seed
+RECORD = struct.Struct('<{}sQHIdQ'.format(NAME_SIZE))
+
+ScoreRecord = namedtuple('ScoreRecord', ['name', 'score', 'level', 'lines', 'timestamp', 'seed'])
+
+def stored_name(name):
+    """Returns a player name cut to the NAME_SIZE UTF-8 bytes kept in a record"""
+    return name.encode('utf-8')[:NAME_SIZE].decode('utf-8', 'ignore')
+
+def pack(record):
+    """Returns the bytes of a record"""
+    name = stored_name(record.name).encode('utf-8')
+    return RECORD.pack(name, record.score, record.level, record.lines, record.timestamp, record.seed)
+
+def unpack(buffer, offset=0):
+    """Reads the record stored at an offset of a buffer"""
+    name, score, level, lines, timestamp, seed = RECORD.unpack_from(buffer, offset)
+    return ScoreRecord(name.rstrip(b'\0').decode('utf-8', 'replace'), score, level, lines,\
+        timestamp, seed)
+
+class ScoreStore:
+    """High scores kept in an append-only record log and its sidecar index
+
+    The index stores how many records it covers, the top records as
+    (score, record number) pairs, how many of them it keeps and the record
+    number of every player's best game. Records appended by another process
+    are indexed the next time the index is read; a log shorter than the
+    index or an index keeping fewer top records than asked rebuilds it."""
+
+    def __init__(self, path=SCORES_FILE, top_size=TOP_SIZE):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.top_size = top_size
+        self.__count = 0
+        self.__top = []
+        self.__best = {}
+        self.__best_scores = {}
+        self.__load_index()
+
+    def __len__(self):
+        return self.__count
+
+    def __record_count(self):
+        """Returns the number of complete records in the log"""
+        try:
+            return os.path.getsize(self.path) // RECORD.size
+        except OSError:
+            return 0
+
+    def __load_index(self):
+        """Reads the sidecar index and indexes the records appended since it was written"""
+        try:
+            with open(self.index_path) as index:
+                data = json.load(index)
+            count, top, best = data['count'], data['top'], data['best']
+            top_size = data['top_size']
+        except (OSError, ValueError, KeyError):
+            count, top, best, top_size = 0, [], {}, self.top_size
+        total = self.__record_count()
+        if count > total or top_size < self.top_size:
+            count, top, best = 0, [], {}
+        self.__count = count
+        self.__top = [tuple(entry) for entry in top[:self.top_size]]
+        self.__best = best
+        self.__best_scores = {}
+        if count < total:
+            with open(self.path, 'rb') as log,\
+                mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as records:
+                for number in range(count, total):
+                    self.__index(number, unpack(records, number * RECORD.size))
+            self.__save_index()
+
+    def __index(self, number, record):
+        """Adds a record to the in-memory index"""
+        self.__count = number + 1
+        top = self.__top
+        if len(top) < self.top_size or record.score > top[-1][0]:
+            top.append((record.score, number))
+            top.sort(key=lambda entry: (-entry[0], entry[1]))
+            del top[self.top_size:]
+        if record.name not in self.__best or record.score > self.__best_score(record.name):
+            self.__best[record.name] = number
+            self.__best_scores[record.name] = record.score
+
+    def __best_score(self, name):
+        """Returns the score of the best record of a player"""
+        score = self.__best_scores.get(name)
+        if score is None:
+            score = self.__best_scores[name] = self.read(self.__best[name]).score
+        return score
+
+    def __save_index(self):
+        """Writes the sidecar index, replacing the previous one atomically"""
+        temporary = self.index_path + '.tmp'
+        with open(temporary, 'w') as index:
+            json.dump({'count': self.__count, 'top': self.__top, 'top_size': self.top_size,\
+                'best': self.__best}, index)
+        os.replace(temporary, self.index_path)
+
+    def append(self, name, score, level, lines, seed, timestamp=None):
+        """Appends the record of a finished game, returns its ScoreRecord"""
+        record = ScoreRecord(stored_name(name), score, level, lines,\
+            time() if timestamp is None else timestamp, seed)
+        # Catching up with the records appended by other processes first
+        if self.__record_count() != self.__count:
+            self.__load_index()
+        with open(self.path, 'ab') as log:
+            # Dropping the partial record of an interrupted write
+            log.truncate(self.__count * RECORD.size)
+            log.write(pack(record))
+        self.__index(self.__count, record)
+        self.__save_index()
+        return record
+
+    def read(self, number):
+        """Returns the record at a position of the log"""
+        with open(self.path, 'rb') as log:
+            log.seek(number * RECORD.size)
+            return unpack(log.read(RECORD.size))
+
+    def records(self):
+        """Yields every record of the log in order, reading it through mmap"""
+        if not self.__record_count():
+            return
+        with open(self.path, 'rb') as log,\
+            mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as records:
+            for offset in range(0, len(records) - RECORD.size + 1, RECORD.size):
+                yield unpack(records, offset)
+
+    def top(self, count=None):
+        """Returns the best records, highest score first"""
+        return [self.read(number) for _, number in self.__top[:count]]
+
+    def best(self, name):
+        """Returns the best record of a player, None if the player never played"""
+        number = self.__best.get(stored_name(name))
+        return None if number is None else self.read(number)
+
+def main():
+    """Leaderboard entry point"""
+    parser = ArgumentParser(description='Shows the Tetris high scores')
+    parser.add_argument('--path', default=SCORES_FILE)
+    parser.add_argument('--player', help='shows the best game of a player')
+    parser.add_argument('--top', type=int, default=TOP_SIZE)
+    args = parser.parse_args()
+
+    store = ScoreStore(args.path, max(args.top, TOP_SIZE))
+    records = [store.best(args.player.upper())] if args.player else store.top(args.top)
+    print('{} games recorded'.format(len(store)))
+    for rank, record in enumerate(filter(None, records), 1):
+        print('{:>3}. {:<16} {:>10} level {:>3} lines {:>5}'.format(\
+            rank, record.name, record.score, record.level, record.lines))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+    Title       : Tetris Game - Self-play Runner
+
+    Plays many seeded headless games across all cores:
+        python selfplay.py --games 10000 --workers 8 --output results.jsonl
+"""
+import json
+from argparse import ArgumentParser
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from random import Random
+from time import perf_counter
+
+from ai import AutoPlayer
+from engine import MOVES, GameState, Player
+
+MAX_TICKS = 1000000
+# The autoplayer almost never tops out, its games end at this piece count
+MAX_PIECES = 500
+
+GameResult = namedtuple('GameResult', ['seed', 'score', 'lines', 'level', 'pieces', 'ticks', 'duration'])
+
+def random_policy(seed):
+    """Returns a policy playing a random action (or none) every tick"""
+    rng = Random(seed)
+    choices = [(action,) for action in MOVES] + [()]
+    return lambda state: rng.choice(choices)
+
+def ai_policy(seed):
+    """Returns the autoplayer policy"""
+    return AutoPlayer()
+
+POLICIES = {'random': random_policy, 'ai': ai_policy}
+
+def play_game(seed, max_ticks=MAX_TICKS, policy='random', max_pieces=MAX_PIECES):
+    """Plays one seeded headless game until game over or a cap (0: no limit), returns its GameResult"""
+    start = perf_counter()
+    state = GameState(Player('CPU'), seed)
+    play = POLICIES[policy](seed + 1)
+    while not state.is_over and state.ticks < max_ticks and\
+        not (max_pieces and state.pieces >= max_pieces):
+        # A policy returns the actions to apply before the next tick
+        for action in play(state):
+            state.step(action)
+        state.tick()
+    return GameResult(seed, state.player.get_score(), state.lines, state.level,\
+        state.pieces, state.ticks, perf_counter() - start)
+
+def run(seeds, workers=None, max_ticks=MAX_TICKS, policy='random', max_pieces=MAX_PIECES):
+    """Shards the seeded games across worker processes, yields the results as they stream back"""
+    seeds = list(seeds)
+    workers = workers or cpu_count() or 1
+    chunksize = max(1, len(seeds) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(play_game, seeds, [max_ticks] * len(seeds),\
+            [policy] * len(seeds), [max_pieces] * len(seeds), chunksize=chunksize)
+
+class Summary:
+    """Aggregates game results"""
+
+    FIELDS = ('score', 'lines', 'level', 'pieces', 'duration')
+
+    def __init__(self):
+        self.games = 0
+        self.totals = dict.fromkeys(self.FIELDS, 0)
+        self.maximums = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, result):
+        """Adds a game result to the aggregate"""
+        self.games += 1
+        for field in self.FIELDS:
+            value = getattr(result, field)
+            self.totals[field] += value
+            self.maximums[field] = max(self.maximums[field], value)
+
+    def as_dict(self):
+        """Returns the mean and max of every field"""
+        games = max(self.games, 1)
+        return {'games': self.games,\
+            'mean': {field: self.totals[field] / games for field in self.FIELDS},\
+            'max': dict(self.maximums)}
+
+def main():
+    """Self-play entry point"""
+    parser = ArgumentParser(description='Plays seeded headless Tetris games on every core')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS)
+    parser.add_argument('--max-pieces', type=int, default=MAX_PIECES, help='pieces per game (0: no limit)')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random')
+    parser.add_argument('--output', help='JSON lines file receiving every game result')
+    args = parser.parse_args()
+
+    start = perf_counter()
+    summary = Summary()
+    output = open(args.output, 'w') if args.output else None
+    try:
+        for result in run(range(args.seed, args.seed + args.games), args.workers,\
+            args.max_ticks, args.policy, args.max_pieces):
+            summary.add(result)
+            if output:
+                output.write(json.dumps(result._asdict()) + '\n')
+    finally:
+        if output:
+            output.close()
+    elapsed = perf_counter() - start
+    report = summary.as_dict()
+    report['elapsed'] = elapsed
+    report['games_per_second'] = summary.games / elapsed if elapsed else 0
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""
+    Title       : Tetris Game - Spectator Feed
+
+    Streams the boards to spectators as deltas: each tick only carries what
+    changed since the previous one, full snapshots are sent when a viewer
+    joins and at periodic keyframes.
+        python spectate.py --boards 20 --viewers 200 --ticks 1200
+
+    Messages, one JSON object per line:
+        keyframe : {"b": board, "t": tick, "k": 1, "r": [row colors x ROWS],
+                    "p": [type, rotation, x, y], "n": next type, "s": [score, level, lines]}
+        delta    : {"b": board, "t": tick, "r": {row index: row colors}, and "p", "n",
+                    "s" only when they changed}
+    Row colors are the hex string of the COLS color codes of a row.
+"""
+import json
+from argparse import ArgumentParser
+from time import perf_counter
+
+from ai import AutoPlayer
+from board import COLS, ROWS
+from engine import Controller, GameState, Player
+
+KEYFRAME_TICKS = 120
+
+def dumps(message):
+    """Returns the JSON line of a message"""
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+class FeedEncoder:
+    """Encodes the successive ticks of one game state as keyframes and deltas"""
+
+    def __init__(self, board_id, state, keyframe_ticks=KEYFRAME_TICKS):
+        self.board_id = board_id
+        self.state = state
+        self.keyframe_ticks = keyframe_ticks
+        self.ticks = 0
+        self.bytes = 0
+        self.keyframes = 0
+        self.__colors = bytearray(ROWS * COLS)
+        self.__piece = None
+        self.__next = None
+        self.__stats = None
+
+    def __values(self):
+        """Returns the current piece, next piece type and stats of the state"""
+        state = self.state
+        piece = state.current_piece
+        return [piece.piece_type, piece.rotation, piece.pos_x, piece.pos_y],\
+            state.next_piece.piece_type, [state.player.get_score(), state.level, state.lines]
+
+    def snapshot(self, reference=False):
+        """Returns a keyframe of the current state, which becomes the reference of
+        the next delta if reference is True"""
+        colors = self.state.board.colors
+        piece, next_type, stats = self.__values()
+        if reference:
+            self.__colors[:] = colors
+            self.__piece, self.__next, self.__stats = piece, next_type, stats
+        return dumps({'b': self.board_id, 't': self.ticks, 'k': 1,\
+            'r': [colors[y_index * COLS:(y_index + 1) * COLS].hex() for y_index in range(ROWS)],\
+            'p': piece, 'n': next_type, 's': stats})
+
+    def encode(self):
+        """Encodes the next tick, returns the message bytes or None when nothing changed"""
+        self.ticks += 1
+        colors = self.state.board.colors
+        piece, next_type, stats = self.__values()
+        if (self.ticks - 1) % self.keyframe_ticks == 0:
+            data = self.snapshot()
+            self.keyframes += 1
+        else:
+            message = {}
+            sent = self.__colors
+            if colors != sent:
+                changed = message['r'] = {}
+                for start in range(0, ROWS * COLS, COLS):
+                    row = colors[start:start + COLS]
+                    if row != sent[start:start + COLS]:
+                        changed[start // COLS] = row.hex()
+            if piece != self.__piece:
+                message['p'] = piece
+            if next_type != self.__next:
+                message['n'] = next_type
+            if stats != self.__stats:
+                message['s'] = stats
+            if not message:
+                return None
+            message['b'] = self.board_id
+            message['t'] = self.ticks
+            data = dumps(message)
+        self.__colors[:] = colors
+        self.__piece, self.__next, self.__stats = piece, next_type, stats
+        self.bytes += len(data)
+        return data
+
+class FeedDecoder:
+    """Rebuilds a spectated board from its keyframes and deltas"""
+
+    def __init__(self):
+        self.colors = bytearray(ROWS * COLS)
+        self.piece = None
+        self.next_type = None
+        self.stats = None
+        self.tick = None
+
+    def apply(self, message):
+        """Applies a decoded message, returns False if a delta arrived before any keyframe"""
+        if not message.get('k') and self.tick is None:
+            return False
+        rows = enumerate(message['r']) if message.get('k') else message.get('r', {}).items()
+        for y_index, row in rows:
+            start = int(y_index) * COLS
+            self.colors[start:start + COLS] = bytes.fromhex(row)
+        self.piece = message.get('p', self.piece)
+        self.next_type = message.get('n', self.next_type)
+        self.stats = message.get('s', self.stats)
+        self.tick = message['t']
+        return True
+
+class Viewer:
+    """A spectator connection: anything with write(bytes), and the bytes sent to it"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.bytes = 0
+
+    def send(self, data):
+        """Writes bytes to the spectator"""
+        self.writer.write(data)
+        self.bytes += len(data)
+
+class SpectatorHub:
+    """Encodes every board once per tick and fans the messages out to its viewers"""
+
+    def __init__(self, keyframe_ticks=KEYFRAME_TICKS):
+        self.keyframe_ticks = keyframe_ticks
+        self.encoders = {}
+        self.viewers = {}
+        self.ticks = 0
+        self.elapsed = 0.0
+
+    def add_board(self, board_id, state):
+        """Starts streaming a game state"""
+        self.encoders[board_id] = FeedEncoder(board_id, state, self.keyframe_ticks)
+        self.viewers.setdefault(board_id, [])
+
+    def remove_board(self, board_id):
+        """Stops streaming a board, returns its encoder for the statistics"""
+        self.viewers.pop(board_id, None)
+        return self.encoders.pop(board_id, None)
+
+    def watch(self, board_id, writer):
+        """Subscribes a spectator to a board and sends it a snapshot, returns its Viewer
+
+        The boards nobody watches are not encoded, the snapshot sent to their
+        first viewer restarts their deltas."""
+        viewer = Viewer(writer)
+        viewer.send(self.encoders[board_id].snapshot(reference=not self.viewers[board_id]))
+        self.viewers[board_id].append(viewer)
+        return viewer
+
+    def unwatch(self, board_id, viewer):
+        """Unsubscribes a spectator"""
+        if viewer in self.viewers.get(board_id, ()):
+            self.viewers[board_id].remove(viewer)
+
+    def publish(self):
+        """Sends the changes of every watched board since the previous tick to its viewers"""
+        self.ticks += 1
+        for board_id, encoder in self.encoders.items():
+            viewers = self.viewers[board_id]
+            if not viewers:
+                encoder.ticks += 1
+                continue
+            start = perf_counter()
+            data = encoder.encode()
+            self.elapsed += perf_counter() - start
+            if data is not None:
+                for viewer in viewers:
+                    viewer.send(data)
+
+class Collector:
+    """In-process spectator checking the feed against the spectated state"""
+
+    def __init__(self):
+        self.decoder = FeedDecoder()
+
+    def write(self, data):
+        """Decodes the received messages"""
+        for line in data.splitlines():
+            self.decoder.apply(json.loads(line))
+
+def report(hub, viewers, seconds):
+    """Prints the bandwidth per board and per viewer, compared with full snapshots"""
+    boards = list(hub.encoders.values())
+    if not boards or not seconds:
+        return
+    sent = sum(encoder.bytes for encoder in boards)
+    snapshot = sum(len(encoder.snapshot()) for encoder in boards) / len(boards)
+    received = sum(viewer.bytes for viewer in viewers)
+    print('{} boards, {} viewers, {} ticks in {:.1f} s ({:.3f} ms encoding per tick)'.format(\
+        len(boards), len(viewers), hub.ticks, seconds, hub.elapsed / max(hub.ticks, 1) * 1000))
+    print('per board  : {:>10,.0f} B/s, {:,.0f} B/s with full snapshots every tick'.format(\
+        sent / len(boards) / seconds, snapshot * hub.ticks / seconds))
+    print('per viewer : {:>10,.0f} B/s'.format(received / max(len(viewers), 1) / seconds))
+
+def main():
+    """Spectator feed demo: autoplayer games watched by in-process spectators"""
+    parser = ArgumentParser(description='Streams headless autoplayer games to simulated spectators')
+    parser.add_argument('--boards', type=int, default=20)
+    parser.add_argument('--viewers', type=int, default=200)
+    parser.add_argument('--ticks', type=int, default=600, help='logic frames to stream')
+    parser.add_argument('--keyframe-ticks', type=int, default=KEYFRAME_TICKS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    hub = SpectatorHub(args.keyframe_ticks)
+    games = []
+    for index in range(args.boards):
+        state = GameState(Player('BOT{}'.format(index)), args.seed + index)
+        games.append((Controller(state), AutoPlayer(lookahead=False)))
+        hub.add_board(index, state)
+    viewers = [hub.watch(index % args.boards, Collector()) for index in range(args.viewers)]
+    for _ in range(args.ticks):
+        for controller, player in games:
+            for action in player(controller.state):
+                controller.queue(action)
+            controller.frame()
+        hub.publish()
+    seconds = args.ticks * games[0][0].frame_ms / 1000 if games else 0
+    report(hub, viewers, seconds)
+    mismatches = sum(viewer.writer.decoder.colors !=\
+        hub.encoders[index % args.boards].state.board.colors for index, viewer in enumerate(viewers))
+    print('{} spectators out of sync'.format(mismatches))
+
+if __name__ == '__main__':
+    main()
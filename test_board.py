@@ -0,0 +1,105 @@
+"""
+    Title       : Tetris Game - Bitboard tests
+"""
+from random import Random
+
+from board import COLS, FULL_MASK, ROWS, Board, Features
+from pieces import PIECE_TYPES, SHAPES
+
+def random_board(rng, height):
+    """Returns a board with random bottom rows, some of them full, holes and overhangs included"""
+    board = Board()
+    for y_index in range(ROWS - height, ROWS):
+        row = FULL_MASK if rng.random() < 0.2 else rng.getrandbits(COLS)
+        board.rows[y_index] = row
+        for x_index in range(COLS):
+            if row >> x_index & 1:
+                board.colors[y_index * COLS + x_index] = rng.randrange(1, len(PIECE_TYPES) + 1)
+    board.update_features()
+    return board
+
+def reference_features(rows):
+    """Computes the Features cell by cell from their definitions"""
+    cells = [[row >> x_index & 1 for x_index in range(COLS)] for row in rows]
+    heights = []
+    holes = 0
+    for x_index in range(COLS):
+        column = [cells[y_index][x_index] for y_index in range(ROWS)]
+        top = column.index(1) if 1 in column else ROWS
+        heights.append(ROWS - top)
+        holes += column[top:].count(0)
+    row_changes = 0
+    for line in cells:
+        line = [1] + line + [1]
+        row_changes += sum(left != right for left, right in zip(line, line[1:]))
+    column_changes = 0
+    for x_index in range(COLS):
+        column = [0] + [cells[y_index][x_index] for y_index in range(ROWS)] + [1]
+        column_changes += sum(above != below for above, below in zip(column, column[1:]))
+    bumpiness = sum(abs(left - right) for left, right in zip(heights, heights[1:]))
+    sides = [ROWS] + heights + [ROWS]
+    wells = sum(max(min(sides[x_index], sides[x_index + 2]) - sides[x_index + 1], 0)\
+        for x_index in range(COLS))
+    return Features(sum(heights), max(heights), holes, row_changes, column_changes, bumpiness, wells)
+
+def reference_break_lines(rows, colors, lines):
+    """Returns the rows and colors once the given rows are removed, rebuilt from scratch"""
+    kept = [y_index for y_index in range(ROWS) if y_index not in set(lines)]
+    new_colors = bytearray(len(lines) * COLS)
+    for y_index in kept:
+        new_colors += colors[y_index * COLS:(y_index + 1) * COLS]
+    return [0] * len(lines) + [rows[y_index] for y_index in kept], new_colors
+
+def scan_landing_row(board, shape, pos_x, pos_y):
+    """Moves a shape down one row at a time until it cannot fall"""
+    while board.fits(shape, pos_x, pos_y + 1):
+        pos_y += 1
+    return pos_y
+
+def test_landing_row_matches_a_scan():
+    rng = Random(1)
+    for _ in range(300):
+        board = random_board(rng, rng.randrange(ROWS))
+        board.break_lines(board.get_lines())
+        for piece_type in PIECE_TYPES:
+            for shape in SHAPES[piece_type]:
+                for pos_x in range(-shape.min_dx, COLS - shape.max_dx):
+                    for pos_y in range(-2, ROWS - 1):
+                        if board.fits(shape, pos_x, pos_y):
+                            assert board.landing_row(shape, pos_x, pos_y) ==\
+                                scan_landing_row(board, shape, pos_x, pos_y)
+
+def test_features_match_a_recompute():
+    rng = Random(2)
+    for _ in range(200):
+        board = Board()
+        for _ in range(80):
+            shape = rng.choice(SHAPES[rng.choice(PIECE_TYPES)])
+            pos_x = rng.randrange(-shape.min_dx, COLS - shape.max_dx)
+            if not board.fits(shape, pos_x, -2):
+                break
+            board.merge(shape, pos_x, board.landing_row(shape, pos_x, -2), 1)
+            if rng.random() < 0.3:
+                # Reading the features between the updates
+                board.get_features()
+            board.break_lines(board.get_lines())
+            if rng.random() < 0.05:
+                board.add_garbage(rng.randrange(1, 3), rng.randrange(COLS))
+            if rng.random() < 0.05:
+                copy = Board()
+                copy.copy_from(board)
+                board = copy
+            assert board.get_features() == reference_features(board.rows)
+            assert board.cells == sum(bin(row).count('1') for row in board.rows)
+
+def test_break_lines_matches_a_rebuild():
+    rng = Random(3)
+    for _ in range(2000):
+        board = random_board(rng, rng.randrange(ROWS + 1))
+        board.get_features()
+        lines = board.get_lines()
+        rows, colors = reference_break_lines(board.rows, board.colors, lines)
+        board.break_lines(lines)
+        assert board.rows == rows
+        assert board.colors == colors
+        assert board.get_features() == reference_features(rows)
@@ -0,0 +1,135 @@
+"""
+    Title       : Tetris Game - Headless Engine tests
+"""
+import subprocess
+import sys
+from random import Random
+
+import pytest
+
+from ai import AutoPlayer
+from engine import ACTION_HARD_DROP, ACTION_RIGHT, ACTION_ROTATE, ACTION_SOFT_DROP, ARR, DAS,\
+    LOGIC_FRAME_MS, MOVES, SPEED_UP_DELAY, Controller, GameState, Player
+from pieces import PIECE_TYPES
+
+def play(seed, actions):
+    """Plays a seeded game with the given (action or None) per tick, returns its results"""
+    state = GameState(Player('TEST'), seed)
+    for action in actions:
+        if state.is_over:
+            break
+        if action:
+            state.step(action)
+        state.tick()
+    return state.player.get_score(), state.lines, state.level, state.pieces, state.ticks,\
+        list(state.board.rows)
+
+def test_seeded_games_are_deterministic():
+    rng = Random(4)
+    actions = [rng.choice(MOVES + (ACTION_HARD_DROP, None, None)) for _ in range(5000)]
+    assert play(7, actions) == play(7, actions)
+    assert play(7, actions) != play(8, actions)
+
+def test_batch_matches_game_state():
+    np = pytest.importorskip('numpy')
+    import batch
+    count = 20
+    rng = Random(5)
+    states = [GameState(Player('TEST'), seed) for seed in range(count)]
+    games = batch.BatchGame(count, 0)
+    codes = {action: code for code, action in zip((batch.LEFT, batch.RIGHT, batch.ROTATE), MOVES)}
+
+    def mirror_pieces():
+        # Both engines draw their pieces differently: the batch follows the game states
+        games.next_types[:] = [PIECE_TYPES.index(state.next_piece.piece_type) for state in states]
+
+    games.types[:] = [PIECE_TYPES.index(state.current_piece.piece_type) for state in states]
+    games.pos_y = batch.SPAWN_Y[games.types]
+    mirror_pieces()
+    # The autoplayer moves half of the games, without hard drops, to clear lines
+    player = AutoPlayer(lookahead=False)
+    plans = [[] for _ in range(count)]
+    planned = [None] * count
+    for _ in range(4000):
+        if games.is_over.all():
+            break
+        actions = []
+        for index, state in enumerate(states):
+            if index % 2:
+                actions.append(rng.choice(MOVES + (None,)))
+                continue
+            if planned[index] != state.pieces and not state.is_over:
+                planned[index] = state.pieces
+                plans[index] = player.plan(state)[:-1]
+            actions.append(plans[index].pop(0) if plans[index] else None)
+        for state, action in zip(states, actions):
+            if action and not state.is_over:
+                state.step(action)
+            state.tick()
+        games.step(np.array([codes.get(action, batch.NOOP) for action in actions]))
+        games.tick()
+        mirror_pieces()
+        for index, state in enumerate(states):
+            assert list(games.boards[index]) == state.board.rows
+            assert (games.scores[index], games.lines[index], games.levels[index],\
+                games.pieces[index], games.ticks[index], games.is_over[index]) ==\
+                (state.player.get_score(), state.lines, state.level, state.pieces, state.ticks,\
+                state.is_over)
+    assert games.is_over.any()
+    assert games.lines.sum() > 0
+
+def run_frames(controller, count, read):
+    """Runs count logic frames, returns the frame numbers where read() changed"""
+    changes = []
+    value = read()
+    for _ in range(count):
+        controller.frame()
+        if read() != value:
+            value = read()
+            changes.append(controller.frames)
+    return changes
+
+def test_held_shift_repeats_after_das_every_arr():
+    state = GameState(Player('TEST'), 1)
+    controller = Controller(state)
+    controller.press(ACTION_RIGHT)
+    moves = run_frames(controller, 20, lambda: state.current_piece.pos_x)
+    # One move on the press, then one per ARR once the key is held for DAS
+    def repeats(frame):
+        held = LOGIC_FRAME_MS * (frame - 1)
+        return 0 if held < DAS else (held - DAS) // ARR + 1
+    expected = [frame for frame in range(2, 26) if repeats(frame) != repeats(frame - 1)]
+    assert moves == [1] + expected[:3] == [1, 12, 15, 18]
+    # An OS repeat of the held key is not a new press: the repeats go on
+    controller.release(ACTION_RIGHT)
+    controller.press(ACTION_RIGHT)
+    assert run_frames(controller, 5, lambda: state.current_piece.pos_x) == expected[3:] == [21, 25]
+
+def test_rotation_needs_a_new_press():
+    state = GameState(Player('TEST'), 1)
+    controller = Controller(state)
+    controller.press(ACTION_ROTATE)
+    assert run_frames(controller, 20, lambda: state.current_piece.rotation) == [1]
+    controller.release(ACTION_ROTATE)
+    controller.frame()
+    controller.press(ACTION_ROTATE)
+    assert run_frames(controller, 5, lambda: state.current_piece.rotation) == [22]
+
+def test_soft_drop_speeds_gravity_while_held():
+    state = GameState(Player('TEST'), 1)
+    controller = Controller(state)
+    falls = run_frames(controller, 20, lambda: state.current_piece.pos_y)
+    assert falls == []
+    controller.press(ACTION_SOFT_DROP)
+    falls = run_frames(controller, 20, lambda: state.current_piece.pos_y)
+    assert state.is_speed_up
+    # The pending gravity is cut to the soft drop delay, so a row falls at once
+    assert falls[0] == 21
+    assert len(falls) == (SPEED_UP_DELAY + 20 * LOGIC_FRAME_MS) // SPEED_UP_DELAY
+    controller.release(ACTION_SOFT_DROP)
+    controller.frame()
+    assert not state.is_speed_up
+
+def test_engine_does_not_import_tkinter():
+    code = 'import sys, engine, board, pieces; sys.exit("tkinter" in sys.modules)'
+    assert subprocess.run([sys.executable, '-c', code]).returncode == 0
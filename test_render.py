@@ -0,0 +1,72 @@
+"""
+    Title       : Tetris Game - Renderer tests
+"""
+from ai import AutoPlayer
+from engine import Controller, GameState, Player
+from render import Renderer
+
+class Canvas:
+    """Canvas replacement keeping the options and coordinates of every item"""
+
+    def __init__(self):
+        self.items = {}
+        self.calls = 0
+
+    def __create(self, *args, **kwargs):
+        self.calls += 1
+        item = len(self.items) + 1
+        self.items[item] = dict(kwargs, coords=args)
+        return item
+
+    create_image = create_rectangle = create_text = __create
+
+    def itemconfig(self, item, **kwargs):
+        self.calls += 1
+        self.items[item].update(kwargs)
+
+    def coords(self, item, *args):
+        self.calls += 1
+        self.items[item]['coords'] = args
+
+def visible(canvas):
+    """Returns the shown items, a hidden item keeping the fill of its last color"""
+    return {item: options for item, options in canvas.items.items()\
+        if options.get('state') != 'hidden'}
+
+def fresh_render(state):
+    """Returns the shown items of a state drawn by a new renderer"""
+    canvas = Canvas()
+    Renderer(canvas).draw(state)
+    return visible(canvas)
+
+def test_renderer_matches_a_fresh_render():
+    state = GameState(Player('TEST'), 3)
+    controller = Controller(state)
+    player = AutoPlayer(lookahead=False)
+    canvas = Canvas()
+    renderer = Renderer(canvas)
+    renderer.draw(state)
+    while not state.is_over and state.pieces < 40:
+        for action in player(state):
+            controller.queue(action)
+        controller.frame()
+        if controller.frames % 50 == 0:
+            state.add_garbage(1, controller.frames % 10)
+        renderer.draw(state)
+        assert visible(canvas) == fresh_render(state)
+        # Nothing changed since the previous draw: no item call at all
+        calls = canvas.calls
+        renderer.draw(state)
+        assert canvas.calls == calls
+
+def test_revision_change_redraws_the_platform():
+    state = GameState(Player('TEST'), 3)
+    canvas = Canvas()
+    renderer = Renderer(canvas)
+    renderer.draw(state)
+    calls = canvas.calls
+    state.add_garbage(2, 4)
+    renderer.draw(state)
+    # 9 cells per garbage row are shown and the ghost moves up, the HUD did not change
+    assert canvas.calls == calls + 2 * 9 + 4
+    assert visible(canvas) == fresh_render(state)
@@ -0,0 +1,74 @@
+"""
+    Title       : Tetris Game - Replays tests
+"""
+import pytest
+
+from ai import AutoPlayer
+from engine import Controller, GameState, Player
+from replay import HEADER, Recorder, load, read_varint, replay, verify, write_varint
+
+def record(path, seed=3, pieces=60):
+    """Records an autoplayer session holding key presses and releases, returns the recorder"""
+    state = GameState(Player('ÉLODIE'), seed)
+    controller = Controller(state)
+    recorder = Recorder(controller)
+    player = AutoPlayer(lookahead=False)
+    while not state.is_over and state.pieces < pieces:
+        for action in player(state):
+            recorder.record(action)
+            controller.queue(action)
+        if controller.frames % 97 == 0:
+            recorder.record('Down')
+            controller.press('soft_drop')
+        elif controller.frames % 97 == 20:
+            recorder.record('KeyRelease-Down')
+            controller.release('soft_drop')
+        controller.frame()
+    recorder.record('Escape')
+    recorder.save(path)
+    return recorder
+
+def test_varint_round_trip():
+    buffer = bytearray()
+    values = [0, 1, 127, 128, 300, 2 ** 32, 2 ** 63]
+    for value in values:
+        write_varint(buffer, value)
+    offset = 0
+    for value in values:
+        decoded, offset = read_varint(buffer, offset)
+        assert decoded == value
+    assert offset == len(buffer)
+
+def test_replay_round_trip(tmp_path):
+    path = str(tmp_path / 'game.bin')
+    recorder = record(path)
+    session = recorder.as_dict()
+    with load(path) as reader:
+        assert reader.header['player'] == 'ÉLODIE'
+        assert reader.header['seed'] == session['seed']
+        assert list(reader.events()) == session['events']
+        expected, replayed = verify(reader.as_session())
+    assert expected == session['final']
+    assert replayed == expected
+    state = replay(dict(session, events=iter(session['events'])))
+    assert state.board.rows == recorder.state.board.rows
+
+@pytest.mark.parametrize('offset, value', [(HEADER.size - 7, 9), (HEADER.size + 1, 0xff),\
+    (HEADER.size, 0x7f), (0, 0)])
+def test_corrupted_header_raises_value_error(tmp_path, offset, value):
+    path = tmp_path / 'game.bin'
+    record(str(path), pieces=5)
+    data = bytearray(path.read_bytes())
+    data[offset] = value
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        load(str(path))
+
+def test_corrupted_events_fail_the_checksum(tmp_path):
+    path = tmp_path / 'game.bin'
+    record(str(path), pieces=5)
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 0x01
+    path.write_bytes(data)
+    with pytest.raises(ValueError, match='checksum'):
+        load(str(path))
@@ -0,0 +1,64 @@
+"""
+    Title       : Tetris Game - Game Loop tests
+"""
+import heapq
+from itertools import count
+from time import perf_counter, sleep
+
+from scheduler import GameLoop
+
+class EventLoop:
+    """Minimal Tk after() replacement running the callbacks on the real clock"""
+
+    def __init__(self):
+        self.jobs = []
+        self.cancelled = set()
+        self.wakeups = 0
+        self.__ids = count()
+
+    def after(self, delay, callback):
+        job = next(self.__ids)
+        heapq.heappush(self.jobs, (perf_counter() + delay / 1000, job, callback))
+        return job
+
+    def after_cancel(self, job):
+        self.cancelled.add(job)
+
+    def run(self, loop):
+        while self.jobs and loop.is_running():
+            due, job, callback = heapq.heappop(self.jobs)
+            if job in self.cancelled:
+                continue
+            sleep(max(due - perf_counter(), 0))
+            self.wakeups += 1
+            callback()
+
+def test_game_loop_renders_with_the_real_clock():
+    events = EventLoop()
+    ticks = []
+    renders = []
+
+    def tick():
+        ticks.append(perf_counter())
+        loop.invalidate()
+        return len(ticks) < 50
+
+    loop = GameLoop(events.after, events.after_cancel, lambda: 4, tick,\
+        lambda: renders.append(perf_counter()), frame_ms=8)
+    loop.start()
+    events.run(loop)
+    assert len(ticks) == 50
+    # One render per display frame at most, but the game is drawn
+    assert 10 <= len(renders) <= 50
+    assert all(later - earlier >= 0.008 for earlier, later in zip(renders, renders[1:]))
+    # No busy loop: about one wake up per tick or render
+    assert events.wakeups <= 2 * (len(ticks) + len(renders))
+
+def test_game_loop_renders_at_start():
+    events = EventLoop()
+    renders = []
+    loop = GameLoop(events.after, events.after_cancel, lambda: 1000, lambda: False,\
+        lambda: renders.append(perf_counter()))
+    loop.start()
+    assert renders
+    loop.stop()
@@ -0,0 +1,82 @@
+"""
+    Title       : Tetris Game - High Scores tests
+"""
+import os
+
+from scores import RECORD, ScoreStore
+
+def fill(store, count, seed=0):
+    """Appends count records with scattered scores, returns the (name, score) pairs"""
+    games = []
+    for number in range(count):
+        name = 'P{}'.format(number % 7)
+        score = (number * 7919 + seed) % 1000
+        store.append(name, score, 1, 0, number, timestamp=0)
+        games.append((name, score))
+    return games
+
+def expected_top(games, count):
+    """Returns the best scores, ties keeping the first game"""
+    ranked = sorted(enumerate(games), key=lambda game: (-game[1][1], game[0]))
+    return [game[1][1] for game in ranked[:count]]
+
+def test_top_and_best(tmp_path):
+    store = ScoreStore(str(tmp_path / 'scores.log'), top_size=5)
+    games = fill(store, 50)
+    assert len(store) == 50
+    assert [record.score for record in store.top()] == expected_top(games, 5)
+    assert store.best('P3').score == max(score for name, score in games if name == 'P3')
+    assert store.best('NOBODY') is None
+    assert [(record.name, record.score) for record in store.records()] == games
+
+def test_missing_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'scores.log')
+    games = fill(ScoreStore(path), 40)
+    os.remove(path + '.idx')
+    store = ScoreStore(path)
+    assert len(store) == 40
+    assert [record.score for record in store.top()] == expected_top(games, 10)
+
+def test_records_appended_by_another_store_are_indexed(tmp_path):
+    path = str(tmp_path / 'scores.log')
+    first = ScoreStore(path)
+    games = fill(first, 10)
+    second = ScoreStore(path)
+    games += fill(second, 10, seed=500)
+    # The first store catches up before appending
+    first.append('LAST', 5, 1, 0, 0, timestamp=0)
+    games.append(('LAST', 5))
+    store = ScoreStore(path)
+    assert len(store) == len(first) == 21
+    assert [record.score for record in store.top()] == expected_top(games, 10)
+
+def test_truncated_log_rebuilds_the_index(tmp_path):
+    path = str(tmp_path / 'scores.log')
+    games = fill(ScoreStore(path), 30)
+    with open(path, 'r+b') as log:
+        log.truncate(20 * RECORD.size + RECORD.size // 2)
+    store = ScoreStore(path)
+    assert len(store) == 20
+    assert [record.score for record in store.top()] == expected_top(games[:20], 10)
+    # The partial record is overwritten, the next ones stay aligned
+    store.append('NEXT', 2000, 1, 0, 0, timestamp=0)
+    games = games[:20] + [('NEXT', 2000)]
+    assert [(record.name, record.score) for record in store.records()] == games
+    assert [record.score for record in ScoreStore(path).top()] == expected_top(games, 10)
+
+def test_larger_top_size_rebuilds_the_index(tmp_path):
+    path = str(tmp_path / 'scores.log')
+    games = fill(ScoreStore(path, top_size=5), 40)
+    store = ScoreStore(path, top_size=15)
+    assert [record.score for record in store.top()] == expected_top(games, 15)
+    assert [record.score for record in ScoreStore(path, top_size=3).top()] ==\
+        expected_top(games, 3)
+
+def test_non_ascii_names_survive_a_rebuild(tmp_path):
+    path = str(tmp_path / 'scores.log')
+    name = 'É' * 12
+    ScoreStore(path).append(name, 100, 1, 0, 0)
+    os.remove(path + '.idx')
+    store = ScoreStore(path)
+    assert store.best(name).score == 100
+    assert store.best(name).name == 'É' * 8
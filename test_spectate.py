@@ -0,0 +1,66 @@
+"""
+    Title       : Tetris Game - Spectator Feed tests
+"""
+from ai import AutoPlayer
+from engine import Controller, GameState, Player
+from spectate import Collector, SpectatorHub
+
+def in_sync(collector, state):
+    """Checks that a spectator sees the board, pieces and stats of the game state"""
+    decoder = collector.decoder
+    piece = state.current_piece
+    return decoder.colors == state.board.colors and\
+        decoder.piece == [piece.piece_type, piece.rotation, piece.pos_x, piece.pos_y] and\
+        decoder.next_type == state.next_piece.piece_type and\
+        decoder.stats == [state.player.get_score(), state.level, state.lines]
+
+def test_spectators_stay_in_sync():
+    hub = SpectatorHub(keyframe_ticks=25)
+    games = []
+    for index in range(2):
+        state = GameState(Player('BOT'), index)
+        games.append((Controller(state), AutoPlayer(lookahead=False)))
+        hub.add_board(index, state)
+    first = Collector()
+    viewers = {0: [(hub.watch(0, first), first)], 1: []}
+    for tick in range(1, 400):
+        for controller, player in games:
+            for action in player(controller.state):
+                controller.queue(action)
+            controller.frame()
+        hub.publish()
+        # Joining between the keyframes, and board 1 only once nobody watched it for a while
+        if tick in (37, 180):
+            collector = Collector()
+            viewers[0].append((hub.watch(0, collector), collector))
+        if tick == 150:
+            collector = Collector()
+            viewers[1].append((hub.watch(1, collector), collector))
+        if tick == 250:
+            viewer, _ = viewers[1].pop()
+            hub.unwatch(1, viewer)
+        if tick == 300:
+            collector = Collector()
+            viewers[1].append((hub.watch(1, collector), collector))
+        for index, (controller, _) in enumerate(games):
+            assert all(in_sync(collector, controller.state) for _, collector in viewers[index])
+    encoder = hub.encoders[0]
+    assert encoder.keyframes == 16
+    # The deltas are smaller than a snapshot per tick, even with a piece dropped every frame
+    assert encoder.bytes < len(encoder.snapshot()) * encoder.ticks / 3
+
+def test_watching_an_idle_board_restarts_its_deltas():
+    hub = SpectatorHub(keyframe_ticks=1000)
+    state = GameState(Player('BOT'), 0)
+    hub.add_board(0, state)
+    viewer = hub.watch(0, Collector())
+    hub.publish()
+    hub.unwatch(0, viewer)
+    # A change made while nobody watches, then reverted once a viewer joined
+    state.board.colors[0] = 5
+    hub.publish()
+    collector = Collector()
+    hub.watch(0, collector)
+    state.board.colors[0] = 0
+    hub.publish()
+    assert in_sync(collector, state)
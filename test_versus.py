@@ -0,0 +1,87 @@
+"""
+    Title       : Tetris Game - Versus Server tests
+"""
+import json
+
+from board import COLS, FULL_MASK, ROWS, Board
+from engine import ACTION_HARD_DROP
+from pieces import Piece
+from versus import GARBAGE_ROWS, Match
+
+class Writer:
+    """Stream writer keeping the JSON lines sent to a client"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    def messages(self):
+        return [json.loads(line) for line in self.data.splitlines()]
+
+def new_match(names=('ANA', 'BOB')):
+    """Returns a match between two recorded clients and their writers"""
+    writers = [Writer(), Writer()]
+    return Match(1, 42, list(zip(names, writers))), writers
+
+def prepare_clear(state, lines, hole=4):
+    """Fills the lines bottom rows but the hole column and drops a vertical I above it"""
+    board = state.board
+    for y_index in range(ROWS - lines, ROWS):
+        board.rows[y_index] = FULL_MASK & ~(1 << hole)
+    board.update_features()
+    piece = Piece('I')
+    piece.rotation = 1
+    piece.pos_x = hole - piece.get_shape().min_dx
+    state.current_piece = piece
+
+def test_add_garbage_keeps_the_platform_size():
+    board = Board()
+    assert board.add_garbage(ROWS + 5, 3)
+    assert len(board.rows) == ROWS and len(board.colors) == ROWS * COLS
+    assert board.rows == [FULL_MASK & ~(1 << 3)] * ROWS
+    board = Board()
+    board.rows[0] = 1
+    board.update_features()
+    assert not board.add_garbage(1, 0)
+    board = Board()
+    board.rows[ROWS - 1] = 1
+    board.update_features()
+    assert not board.add_garbage(ROWS + 1, 0)
+    assert len(board.rows) == ROWS
+
+def test_cleared_lines_send_garbage():
+    for lines in (1, 2, 3, 4):
+        match, _ = new_match()
+        sender, receiver = match.seats
+        prepare_clear(sender.state, lines)
+        match.apply(sender, {'type': 'actions', 'pieces': 0, 'actions': [ACTION_HARD_DROP]})
+        match.frame()
+        assert sender.state.lines == lines
+        garbage = [row for row in receiver.state.board.rows if row]
+        assert len(garbage) == GARBAGE_ROWS[lines]
+        assert all(bin(row).count('1') == COLS - 1 for row in garbage)
+
+def test_stale_actions_are_ignored():
+    match, _ = new_match()
+    seat = match.seats[0]
+    match.apply(seat, {'type': 'actions', 'pieces': 3, 'actions': [ACTION_HARD_DROP]})
+    assert seat.plan is None
+    # The second drop was meant for the piece already dropped
+    match.apply(seat, {'type': 'actions', 'pieces': 0,\
+        'actions': [ACTION_HARD_DROP, ACTION_HARD_DROP, 'unknown']})
+    assert seat.plan == (0, [ACTION_HARD_DROP, ACTION_HARD_DROP])
+    match.frame()
+    assert seat.state.pieces == 1
+
+def test_results_are_sent_by_seat():
+    match, writers = new_match(('BOT', 'BOT'))
+    assert [writer.messages()[0]['seat'] for writer in writers] == [0, 1]
+    match.forfeit(match.seats[0])
+    match.frame()
+    assert match.is_finished
+    for writer in writers:
+        end = writer.messages()[-1]
+        assert end['type'] == 'end' and end['winner'] == 1
+        assert [result['name'] for result in end['results']] == ['BOT', 'BOT']
@@ -0,0 +1,89 @@
+"""
+    Title       : Tetris Game - Timings
+
+    Lightweight per-phase latency histograms for the hot paths of the game.
+"""
+import json
+from bisect import bisect_left
+
+TICK = 'tick'
+RENDER = 'render'
+COLLISION = 'collision'
+MERGE = 'merge'
+BREAK_LINES = 'break_lines'
+JITTER = 'tick_jitter'
+
+# Bucket upper bounds in seconds: 1 us to ~30 s, each bucket 25% wider
+BUCKETS = tuple(1e-6 * 1.25 ** index for index in range(78))
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed histogram of durations"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, duration):
+        """Adds a duration in seconds"""
+        self.counts[bisect_left(BUCKETS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self):
+        """Returns the summary in milliseconds"""
+        return {'count': self.count,\
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,\
+            'p50_ms': self.percentile(50) * 1000,\
+            'p95_ms': self.percentile(95) * 1000,\
+            'p99_ms': self.percentile(99) * 1000,\
+            'max_ms': self.max * 1000}
+
+class Timings:
+    """Latency histograms of every game phase and the count of overrun ticks"""
+
+    def __init__(self):
+        self.phases = {}
+        self.overruns = 0
+
+    def record(self, phase, duration):
+        """Adds the duration in seconds of one run of a phase"""
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = LatencyHistogram()
+        histogram.record(duration)
+
+    def record_tick(self, duration, delay):
+        """Adds a tick duration, counting it as overrun if it took longer than the delay in ms"""
+        self.record(TICK, duration)
+        if duration * 1000 > delay:
+            self.overruns += 1
+
+    def get(self, phase):
+        """Returns the histogram of a phase, None if it never ran"""
+        return self.phases.get(phase)
+
+    def as_dict(self):
+        """Returns the summary of every phase"""
+        return {'overrun_ticks': self.overruns,\
+            'phases': {phase: histogram.as_dict() for phase, histogram in self.phases.items()}}
+
+    def dump(self, path):
+        """Writes the summary to a JSON file"""
+        with open(path, 'w') as output:
+            json.dump(self.as_dict(), output, indent=2)
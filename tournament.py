@@ -0,0 +1,144 @@
+"""
+    Title       : Tetris Game - Tournament
+
+    Plays every autoplayer configuration on the same seeded games across
+    all cores and ranks them, the workers writing their results straight
+    into shared memory:
+        python tournament.py --games 200 --max-pieces 500
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from math import sqrt
+from multiprocessing import shared_memory
+from os import cpu_count
+from statistics import mean, stdev
+from time import perf_counter
+
+from ai import DEFAULT_WEIGHTS, AutoPlayer
+from engine import GameState, Player
+
+MAX_PIECES = 500
+# Two-sided 95% normal quantile
+Z_95 = 1.96
+FIELDS = ('score', 'lines', 'level', 'pieces', 'ticks', 'topped_out')
+
+ENTRANTS = {
+    'default': {},
+    'greedy': {'lookahead': False},
+    'wide_beam': {'beam': 12},
+    'hole_averse': {'weights': DEFAULT_WEIGHTS._replace(holes=DEFAULT_WEIGHTS.holes * 2)},
+    'flat': {'weights': DEFAULT_WEIGHTS._replace(bumpiness=DEFAULT_WEIGHTS.bumpiness * 2)},
+}
+
+# Shared result array of the current worker process
+SHARED = {}
+
+def play(entrant, seed, max_pieces=MAX_PIECES):
+    """Plays one seeded game with an autoplayer configuration, returns its FIELDS values"""
+    state = GameState(Player(entrant.upper()), seed)
+    player = AutoPlayer(**ENTRANTS[entrant])
+    while not state.is_over and state.pieces < max_pieces:
+        for action in player(state):
+            state.step(action)
+        state.tick()
+    return (state.player.get_score(), state.lines, state.level, state.pieces, state.ticks,\
+        int(state.is_over))
+
+def attach(name):
+    """Worker initializer: maps the shared result array"""
+    memory = shared_memory.SharedMemory(name=name)
+    SHARED['memory'] = memory
+    SHARED['values'] = memory.buf.cast('d')
+
+def play_into(slot, entrant, seed, max_pieces):
+    """Plays a game and stores its values in its slot of the shared result array"""
+    values = SHARED['values']
+    start = slot * len(FIELDS)
+    for index, value in enumerate(play(entrant, seed, max_pieces)):
+        values[start + index] = value
+
+def run(entrants, seeds, workers=None, max_pieces=MAX_PIECES):
+    """Plays every entrant on every seed, returns the FIELDS values by entrant in seed order"""
+    seeds = list(seeds)
+    tasks = [(entrant, seed) for entrant in entrants for seed in seeds]
+    memory = shared_memory.SharedMemory(create=True, size=8 * len(FIELDS) * max(len(tasks), 1))
+    try:
+        workers = workers or cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach,\
+            initargs=(memory.name,)) as executor:
+            # Only None comes back from the workers, the results are in the shared array
+            for _ in executor.map(play_into, range(len(tasks)), *zip(*tasks),\
+                [max_pieces] * len(tasks), chunksize=chunksize):
+                pass
+        with memory.buf.cast('d') as values:
+            results = {entrant: [] for entrant in entrants}
+            for slot, (entrant, _) in enumerate(tasks):
+                results[entrant].append(tuple(values[slot * len(FIELDS):(slot + 1) * len(FIELDS)]))
+    finally:
+        memory.close()
+        memory.unlink()
+    return results
+
+def interval(values):
+    """Returns the mean of the values and the half width of its 95% confidence interval"""
+    if len(values) < 2:
+        return mean(values), float('nan')
+    return mean(values), Z_95 * stdev(values) / sqrt(len(values))
+
+def rank(results, field='score'):
+    """Ranks the entrants by the mean of a field
+
+    Every row holds the entrant, the mean and interval of the field and of
+    the lines, the top out rate, and the paired difference with the leader
+    (same seeds) with its interval."""
+    column = FIELDS.index(field)
+    means = {entrant: mean(game[column] for game in games) for entrant, games in results.items()}
+    order = sorted(results, key=lambda entrant: means[entrant], reverse=True)
+    leader = results[order[0]]
+    table = []
+    for entrant in order:
+        games = results[entrant]
+        differences = [game[column] - best[column] for game, best in zip(games, leader)]
+        table.append((entrant, interval([game[column] for game in games]),\
+            interval([game[FIELDS.index('lines')] for game in games]),\
+            mean(game[FIELDS.index('topped_out')] for game in games),\
+            interval(differences)))
+    return table
+
+def main():
+    """Tournament entry point"""
+    parser = ArgumentParser(description='Ranks autoplayer configurations on identical seeded games')
+    parser.add_argument('entrants', nargs='*',\
+        help='configurations to compare among {} (default: all)'.format(', '.join(ENTRANTS)))
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-pieces', type=int, default=MAX_PIECES)
+    parser.add_argument('--rank-by', choices=FIELDS[:5], default='score')
+    args = parser.parse_args()
+
+    if args.games < 1:
+        parser.error('--games must be at least 1')
+    # Without a cap the strongest entrants could play one game forever
+    if args.max_pieces < 1:
+        parser.error('--max-pieces must be at least 1')
+    entrants = args.entrants or list(ENTRANTS)
+    unknown = [entrant for entrant in entrants if entrant not in ENTRANTS]
+    if unknown:
+        parser.error('unknown entrants: {}'.format(', '.join(unknown)))
+    start = perf_counter()
+    results = run(entrants, range(args.seed, args.seed + args.games), args.workers,\
+        args.max_pieces)
+    elapsed = perf_counter() - start
+    print('{} games per entrant, {} pieces max, {:.1f} s'.format(args.games, args.max_pieces, elapsed))
+    print('{:>4} {:<12} {:>22} {:>18} {:>9} {:>22}'.format(\
+        'rank', 'entrant', args.rank_by + ' (95% CI)', 'lines (95% CI)', 'topped', 'vs leader (95% CI)'))
+    table = rank(results, args.rank_by)
+    for position, (entrant, value, lines, topped, difference) in enumerate(table, 1):
+        print('{:>4} {:<12} {:>12,.1f} +-{:>8,.1f} {:>9,.1f} +-{:>6,.1f} {:>8.1%}'\
+            ' {:>12,.1f} +-{:>8,.1f}'.format(position, entrant, value[0], value[1],\
+            lines[0], lines[1], topped, difference[0], difference[1]))
+
+if __name__ == '__main__':
+    main()
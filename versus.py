@@ -0,0 +1,341 @@
+"""
+    Title       : Tetris Game - Versus Server
+
+    Head-to-head matches hosted by a single asyncio event loop, one
+    headless game state per player: the lines broken by a player are sent
+    to the opponent as garbage rows.
+        python versus.py serve --port 7777
+        python versus.py bots --matches 50 --port 7777
+        python versus.py local --matches 200 --max-pieces 100
+
+    Protocol, one JSON object per line:
+        client : {"type": "join", "name": ...}
+                 {"type": "actions", "pieces": n, "actions": [...]}
+        viewer : {"type": "watch", "board": "match:seat"}, then receives the
+                 spectate.py feed of that board
+        server : {"type": "start", "seed": ..., "seat": 0 or 1, "opponent": ...}
+                 {"type": "piece", "pieces": n, "rows": [...], "piece": [type, rotation, x, y],
+                  "next": type, "opponent": {"lines": ..., "height": ...}}
+                 {"type": "end", "winner": seat or null,
+                  "results": [{name, score, lines, pieces} by seat]}
+    The last actions received are applied at the next frame, and only while
+    "pieces" still matches the piece count.
+"""
+import asyncio
+import json
+from argparse import ArgumentParser
+from collections import namedtuple
+from random import Random
+from time import perf_counter
+
+from ai import AutoPlayer
+from board import COLS, Board
+from engine import ACTIONS, LOGIC_FRAME_MS, Controller, GameState, Player
+from pieces import Piece
+from spectate import SpectatorHub
+
+HOST = '127.0.0.1'
+PORT = 7777
+# Garbage rows sent to the opponent by the number of lines broken at once
+GARBAGE_ROWS = (0, 0, 1, 2, 4)
+
+# What a client knows of its game, enough for AutoPlayer.plan()
+View = namedtuple('View', ['board', 'current_piece', 'next_piece', 'pieces'])
+
+def send(writer, message):
+    """Writes one JSON line, the transport buffers it"""
+    writer.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+
+class Seat:
+    """A player of a match: its connection, game state and controller"""
+
+    def __init__(self, match, index, name, writer, seed):
+        self.match = match
+        self.index = index
+        self.name = name
+        self.writer = writer
+        self.board_id = '{}:{}'.format(match.number, index)
+        self.state = GameState(Player(name), seed)
+        self.controller = Controller(self.state)
+        self.holes = Random(seed + index)
+        self.sent = None
+        # (pieces, actions) received since the last frame
+        self.plan = None
+
+class Match:
+    """Two seats playing the same piece sequence"""
+
+    def __init__(self, number, seed, players, max_pieces=0):
+        self.number = number
+        self.seed = seed
+        self.max_pieces = max_pieces
+        self.seats = [Seat(self, index, name, writer, seed)\
+            for index, (name, writer) in enumerate(players)]
+        self.is_finished = False
+        self.winner = None
+        for seat, opponent in zip(self.seats, reversed(self.seats)):
+            send(seat.writer, {'type': 'start', 'seed': seed, 'seat': seat.index,\
+                'opponent': opponent.name})
+
+    def apply(self, seat, message):
+        """Keeps the actions of a client for the next frame, replacing the previous ones"""
+        if message.get('type') != 'actions' or message.get('pieces') != seat.state.pieces:
+            return
+        actions = message.get('actions', ())
+        if isinstance(actions, list):
+            seat.plan = (seat.state.pieces, [action for action in actions if action in ACTIONS])
+
+    def __play(self, seat):
+        """Applies the kept actions of a client while they are meant for its current piece"""
+        pieces, actions = seat.plan
+        seat.plan = None
+        state = seat.state
+        for action in actions:
+            if state.pieces != pieces or state.is_over:
+                break
+            state.step(action)
+
+    def forfeit(self, seat):
+        """Ends the game of a disconnected player"""
+        seat.state.is_over = True
+
+    def frame(self):
+        """Runs one logic frame of both games, sends the garbage and the new pieces"""
+        for seat, opponent in zip(self.seats, reversed(self.seats)):
+            state = seat.state
+            lines = state.lines
+            if seat.plan is not None:
+                self.__play(seat)
+            seat.controller.frame()
+            rows = GARBAGE_ROWS[min(state.lines - lines, len(GARBAGE_ROWS) - 1)]
+            if rows:
+                opponent.state.add_garbage(rows, seat.holes.randrange(COLS))
+                opponent.sent = None
+        for seat, opponent in zip(self.seats, reversed(self.seats)):
+            self.__send_piece(seat, opponent)
+        over = [seat.state.is_over for seat in self.seats]
+        capped = self.max_pieces and\
+            all(seat.state.pieces >= self.max_pieces for seat in self.seats)
+        if any(over) or capped:
+            self.__finish(over)
+
+    def __send_piece(self, seat, opponent):
+        """Sends the platform and the pieces to a client when a new piece spawned"""
+        state = seat.state
+        if state.is_over or seat.sent == state.pieces or\
+            (self.max_pieces and state.pieces >= self.max_pieces):
+            return
+        piece = state.current_piece
+        send(seat.writer, {'type': 'piece', 'pieces': state.pieces, 'rows': state.board.rows,\
+            'piece': [piece.piece_type, piece.rotation, piece.pos_x, piece.pos_y],\
+            'next': state.next_piece.piece_type,\
+            'opponent': {'lines': opponent.state.lines,\
+                'height': opponent.state.get_features().max_height}})
+        seat.sent = state.pieces
+
+    def __finish(self, over):
+        """Decides the winner and sends the results to both clients"""
+        first, second = self.seats
+        if over[0] != over[1]:
+            self.winner = second if over[0] else first
+        elif first.state.player.get_score() != second.state.player.get_score():
+            self.winner = max(self.seats, key=lambda seat: seat.state.player.get_score())
+        results = [{'name': seat.name, 'score': seat.state.player.get_score(),\
+            'lines': seat.state.lines, 'pieces': seat.state.pieces} for seat in self.seats]
+        for seat in self.seats:
+            send(seat.writer, {'type': 'end',\
+                'winner': None if self.winner is None else self.winner.index, 'results': results})
+        self.is_finished = True
+
+class VersusServer:
+    """Pairs the connected players and runs every match from one frame loop"""
+
+    def __init__(self, frame_ms=LOGIC_FRAME_MS, max_pieces=0, seed=None, hub=None):
+        self.frame_ms = frame_ms
+        self.max_pieces = max_pieces
+        self.hub = hub if hub is not None else SpectatorHub()
+        self.started = 0
+        self.rng = Random(seed)
+        self.matches = []
+        self.finished = 0
+        self.frames = 0
+        self.busy = 0.0
+        self.late_frames = 0
+        self.__waiting = None
+
+    async def handle(self, reader, writer):
+        """Connection handler: joins the lobby, then forwards the client messages"""
+        try:
+            hello = json.loads(await reader.readline())
+            if hello.get('type') == 'watch':
+                await self.__spectate(reader, writer, hello['board'])
+                return
+            name = str(hello['name'])[:16]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            writer.close()
+            return
+        joined = asyncio.get_running_loop().create_future()
+        reading = None
+        if self.__waiting is None:
+            self.__waiting = (name, writer, joined)
+            # Watching the connection until an opponent joins
+            reading = asyncio.ensure_future(reader.readline())
+            while not joined.done():
+                await asyncio.wait((joined, reading), return_when=asyncio.FIRST_COMPLETED)
+                if joined.done():
+                    break
+                if not reading.result():
+                    self.__waiting = None
+                    writer.close()
+                    return
+                # Lines sent before the match starts are dropped
+                reading = asyncio.ensure_future(reader.readline())
+        else:
+            other_name, other_writer, other_joined = self.__waiting
+            self.__waiting = None
+            self.started += 1
+            match = Match(self.started, self.rng.getrandbits(32),\
+                [(other_name, other_writer), (name, writer)], self.max_pieces)
+            self.matches.append(match)
+            for seat in match.seats:
+                self.hub.add_board(seat.board_id, seat.state)
+            other_joined.set_result(match.seats[0])
+            joined.set_result(match.seats[1])
+        seat = await joined
+        while True:
+            line = await (reading or reader.readline())
+            reading = None
+            if not line:
+                seat.match.forfeit(seat)
+                break
+            if not seat.match.is_finished:
+                try:
+                    seat.match.apply(seat, json.loads(line))
+                except ValueError:
+                    pass
+        writer.close()
+
+    async def __spectate(self, reader, writer, board_id):
+        """Streams a board to a viewer until it disconnects"""
+        if board_id not in self.hub.encoders:
+            writer.close()
+            return
+        viewer = self.hub.watch(board_id, writer)
+        while await reader.readline():
+            pass
+        self.hub.unwatch(board_id, viewer)
+        writer.close()
+
+    async def run_frames(self):
+        """Runs a logic frame of every match each frame_ms"""
+        loop = asyncio.get_running_loop()
+        period = self.frame_ms / 1000
+        deadline = loop.time()
+        while True:
+            deadline += period
+            delay = deadline - loop.time()
+            if delay < 0:
+                # Late: skipping the missed frames instead of running them in a burst
+                self.late_frames += 1
+                deadline = loop.time()
+            await asyncio.sleep(max(delay, 0))
+            start = perf_counter()
+            for match in self.matches:
+                match.frame()
+            self.hub.publish()
+            for match in self.matches:
+                if match.is_finished:
+                    for seat in match.seats:
+                        for viewer in self.hub.viewers.get(seat.board_id, ()):
+                            viewer.writer.close()
+                        self.hub.remove_board(seat.board_id)
+            running = [match for match in self.matches if not match.is_finished]
+            self.finished += len(self.matches) - len(running)
+            self.matches = running
+            self.frames += 1
+            self.busy += perf_counter() - start
+
+    async def serve(self, host=HOST, port=PORT):
+        """Starts listening, returns the asyncio server and the frame loop task"""
+        server = await asyncio.start_server(self.handle, host, port)
+        return server, asyncio.create_task(self.run_frames())
+
+def view_of(message):
+    """Rebuilds the game seen by a client from a piece message"""
+    board = Board()
+    board.rows[:] = message['rows']
+    board.update_features()
+    piece_type, rotation, pos_x, pos_y = message['piece']
+    piece = Piece(piece_type)
+    piece.rotation, piece.pos_x, piece.pos_y = rotation, pos_x, pos_y
+    return View(board, piece, Piece(message['next']), message['pieces'])
+
+async def bot(name, host=HOST, port=PORT, player=None):
+    """Scripted client playing one match with the autoplayer, returns the end message"""
+    player = player or AutoPlayer(lookahead=False)
+    reader, writer = await asyncio.open_connection(host, port)
+    send(writer, {'type': 'join', 'name': name})
+    result = None
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        message = json.loads(line)
+        if message['type'] == 'piece':
+            send(writer, {'type': 'actions', 'pieces': message['pieces'],\
+                'actions': player.plan(view_of(message))})
+        elif message['type'] == 'end':
+            result = message
+            break
+    writer.close()
+    await writer.wait_closed()
+    return result
+
+async def run_bots(matches, host=HOST, port=PORT):
+    """Plays the given number of matches with scripted clients, returns their end messages"""
+    results = await asyncio.gather(*(bot('BOT{}'.format(index), host, port)\
+        for index in range(matches * 2)))
+    return [result for result in results if result is not None]
+
+async def local(matches, max_pieces, seed):
+    """Runs a server and its bots on localhost, returns the server and the elapsed time"""
+    versus = VersusServer(max_pieces=max_pieces, seed=seed)
+    server, frames = await versus.serve(HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    start = perf_counter()
+    await run_bots(matches, HOST, port)
+    elapsed = perf_counter() - start
+    frames.cancel()
+    server.close()
+    await server.wait_closed()
+    return versus, elapsed
+
+def main():
+    """Versus entry point"""
+    parser = ArgumentParser(description='Head-to-head Tetris server and scripted clients')
+    parser.add_argument('mode', choices=('serve', 'bots', 'local'))
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--matches', type=int, default=50, help='matches played by the bots')
+    parser.add_argument('--max-pieces', type=int, default=0, help='pieces per player (0: no limit)')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        async def serve():
+            server, _ = await VersusServer(max_pieces=args.max_pieces, seed=args.seed)\
+                .serve(args.host, args.port)
+            async with server:
+                await server.serve_forever()
+        asyncio.run(serve())
+    elif args.mode == 'bots':
+        results = asyncio.run(run_bots(args.matches, args.host, args.port))
+        print('{} matches ended'.format(len(results) // 2))
+    else:
+        versus, elapsed = asyncio.run(local(args.matches, args.max_pieces, args.seed))
+        print('{} matches, {} boards in {:.1f} s'.format(versus.finished, versus.finished * 2, elapsed))
+        print('{} frames, {:.3f} ms busy per frame, {} late frames'.format(versus.frames,\
+            versus.busy / max(versus.frames, 1) * 1000, versus.late_frames))
+
+if __name__ == '__main__':
+    main()